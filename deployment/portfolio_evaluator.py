@@ -5,6 +5,7 @@ Quantitative portfolio evaluation using Monte Carlo simulation.
 """
 
 import argparse
+import asyncio
 import json
 import logging
 import os
@@ -34,11 +35,19 @@ from agentbeats.tool_provider import ToolProvider
 from quant_eval import (
     parse_goal,
     download_yahoo_data,
+    get_market_data_provider,
     run_simulation,
+    run_simulation_horizons,
+    replay_historical_windows,
+    estimate_success_analytic,
+    simulate_sensitivity,
+    sweep_candidate_weights,
     compute_scores,
     get_cached_ticker_info,
     cache_ticker_info,
-    validate_tickers_with_patterns
+    validate_tickers_with_patterns,
+    ANALYTIC_DISCREPANCY_THRESHOLD,
+    ANALYTIC_PRESCREEN_BOUNDS
 )
 
 
@@ -51,6 +60,11 @@ logger = logging.getLogger("portfolio_evaluator")
 # The system already uses pattern-based validation which catches most issues
 search_enabled = False  # Disable web search for now - pattern matching is sufficient
 
+# Sensitivity table grid around each scenario's goal
+SENSITIVITY_CONTRIBUTION_MULTIPLIERS = [0.5, 1.0, 1.5, 2.0, 3.0]
+SENSITIVITY_DEFAULT_CONTRIBUTIONS = [0, 100, 250, 500, 1000]  # when the goal has no contribution
+SENSITIVITY_TIMELINE_OFFSETS = [-5, 0, 5, 10]  # years
+
 
 class PortfolioEvaluation(BaseModel):
     """Evaluation result for a portfolio"""
@@ -61,6 +75,12 @@ class PortfolioEvaluation(BaseModel):
     reasoning: str
     concerns: list[str]
     overall_assessment: str
+    analytic_probability: Optional[float] = None  # closed-form estimate, when requested
+    analytic_discrepancy_flagged: bool = False  # analytic and bootstrap disagree
+    sensitivity: Optional[dict] = None  # probability over contribution x timeline grid
+    historical_replay: Optional[dict] = None  # outcomes of replaying every historical window
+    best_achievable_probability: Optional[float] = None  # best reweighting of the same tickers, when requested
+    regret_vs_best: Optional[float] = None  # best_achievable_probability minus this portfolio's, same paths
 
 
 def validate_portfolio(portfolio: dict) -> tuple[bool, str]:
@@ -106,6 +126,65 @@ def validate_portfolio(portfolio: dict) -> tuple[bool, str]:
     return True, "Valid"
 
 
+def resolve_goal_params(goal: str, config: dict = None) -> dict:
+    """Parse goal parameters from natural language, overridden by structured config"""
+
+    goal_params = parse_goal(goal)
+
+    # Override with structured config if available
+    if config:
+        goal_params['starting_wealth'] = config.get('starting_amount', goal_params['starting_wealth'])
+        goal_params['target_wealth'] = config.get('target_amount', goal_params['target_wealth'])
+        goal_params['timeline_years'] = config.get('timeline_years', goal_params['timeline_years'])
+        goal_params['monthly_contribution'] = config.get('monthly_contribution', goal_params['monthly_contribution'])
+
+    return goal_params
+
+
+def build_sensitivity_table(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns,
+    headline_probability: Optional[float] = None
+) -> dict:
+    """
+    Success probability over contributions and timelines around the goal, from one set of paths.
+
+    The table samples its own paths, so the cell at the goal's own
+    contribution and timeline is set to headline_probability when given,
+    keeping it consistent with the reported probability_of_success.
+    """
+
+    contribution = goal_params['monthly_contribution']
+    if contribution > 0:
+        contributions = [round(contribution * m, 2) for m in SENSITIVITY_CONTRIBUTION_MULTIPLIERS]
+    else:
+        contributions = SENSITIVITY_DEFAULT_CONTRIBUTIONS
+    timelines = [
+        goal_params['timeline_years'] + offset for offset in SENSITIVITY_TIMELINE_OFFSETS
+        if goal_params['timeline_years'] + offset > 0
+    ]
+
+    surface = simulate_sensitivity(goal_params, portfolio, historical_returns, contributions, timelines)
+    probabilities = surface['probability_of_success'].round(1)
+
+    goal_contribution = round(contribution, 2)
+    goal_cell = None
+    if goal_contribution in contributions and goal_params['timeline_years'] in timelines:
+        goal_cell = (contributions.index(goal_contribution), timelines.index(goal_params['timeline_years']))
+    if headline_probability is not None and goal_cell is not None:
+        probabilities[goal_cell] = round(headline_probability, 1)
+
+    table = {
+        "monthly_contributions": surface['monthly_contributions'],
+        "timeline_years": surface['timelines_years'],
+        "probability_of_success": probabilities.tolist()
+    }
+    if headline_probability is not None and goal_cell is not None:
+        table["note"] = "The goal's own contribution and timeline show the headline probability_of_success"
+    return table
+
+
 class PortfolioEvaluator(GreenAgent):
     def __init__(self):
         self._required_roles = ["portfolio_constructor"]
@@ -148,7 +227,19 @@ class PortfolioEvaluator(GreenAgent):
 
             logger.info(f"Evaluating {len(configs)} scenario(s)")
 
-            all_results = []
+            # Optionally simulate scenarios that share a portfolio from one set of paths
+            reuse_paths = bool(req.config.get("reuse_simulation_paths", False))
+            # Closed-form estimate: "off", "report" (alongside bootstrap) or "prescreen"
+            analytic_mode = req.config.get("analytic_estimate", "off")
+            include_sensitivity = bool(req.config.get("sensitivity_table", False))
+            # Best-achievable sweep: SWEEP_NUM_CANDIDATES weightings on shared paths, several
+            # seconds of CPU per scenario (about 9 s for five tickers), run off the event loop
+            include_regret = bool(req.config.get("regret_benchmark", False))
+            # Market data source: "yahoo", "snapshot" or "synthetic" (default: MARKET_DATA_PROVIDER)
+            data_provider = get_market_data_provider(req.config.get("data_provider"))
+
+            # Collect portfolios for every scenario first
+            scenarios = []
 
             for idx, config in enumerate(configs):
                 goal_type = config.get("goal_type", "scenario")
@@ -200,13 +291,35 @@ class PortfolioEvaluator(GreenAgent):
                         new_agent_text_message(f"[{goal_type.upper()}] Validation issue: {validation_message}. Continuing...")
                     )
 
+                scenarios.append((config, goal_type, goal, portfolio))
+
+            # Downloads and shared simulations run in a worker thread to keep the event loop responsive
+            prefetched_returns = await asyncio.to_thread(self.prefetch_scenario_returns, scenarios, data_provider)
+            shared_simulations = {}
+            if reuse_paths:
+                shared_simulations = await asyncio.to_thread(
+                    self.simulate_shared_portfolios, scenarios, data_provider
+                )
+
+            all_results = []
+
+            for idx, (config, goal_type, goal, portfolio) in enumerate(scenarios):
                 # Evaluate portfolio
                 await updater.update_status(
                     TaskState.working,
                     new_agent_text_message(f"[{goal_type.upper()}] Evaluating portfolio...")
                 )
 
-                evaluation = await self.evaluate_portfolio(goal, portfolio, config)
+                scenario_data = {"historical_returns": prefetched_returns.get(idx)}
+                scenario_data.update(shared_simulations.get(idx, {}))
+                evaluation = await self.evaluate_portfolio(
+                    goal, portfolio, config,
+                    analytic_mode=analytic_mode,
+                    include_sensitivity=include_sensitivity,
+                    include_regret=include_regret,
+                    data_provider=data_provider,
+                    **scenario_data
+                )
                 logger.info(f"Evaluation for {goal_type}: {evaluation.model_dump_json()}")
 
                 # Store result with scenario metadata
@@ -224,6 +337,16 @@ class PortfolioEvaluator(GreenAgent):
                     "reasoning": evaluation.reasoning,
                     "concerns": evaluation.concerns
                 }
+                if evaluation.analytic_probability is not None:
+                    scenario_result["analytic_probability"] = evaluation.analytic_probability
+                    scenario_result["analytic_discrepancy_flagged"] = evaluation.analytic_discrepancy_flagged
+                if evaluation.sensitivity is not None:
+                    scenario_result["sensitivity"] = evaluation.sensitivity
+                if evaluation.historical_replay is not None:
+                    scenario_result["historical_replay"] = evaluation.historical_replay
+                if evaluation.regret_vs_best is not None:
+                    scenario_result["best_achievable_probability"] = evaluation.best_achievable_probability
+                    scenario_result["regret_vs_best"] = evaluation.regret_vs_best
                 all_results.append(scenario_result)
 
                 await updater.update_status(
@@ -263,24 +386,116 @@ class PortfolioEvaluator(GreenAgent):
         finally:
             self._tool_provider.reset()
 
+    def prefetch_scenario_returns(self, scenarios: list[tuple], data_provider=None) -> dict[int, object]:
+        """
+        Download the union of all scenario tickers in one bulk request.
+
+        The union download fills the price store and the in-process cache of
+        closes. Each scenario's closes are then served by column selection
+        and its returns computed on its own tickers' bar dates, so they equal
+        a download of its tickers alone even when the union mixes calendars.
+
+        Returns {scenario index: historical returns}. Scenarios missing from
+        the result download their data in evaluate_portfolio.
+        """
+        scenario_tickers = {}
+        for idx, (_, _, _, portfolio) in enumerate(scenarios):
+            valid, _ = validate_portfolio(portfolio)
+            if valid:
+                scenario_tickers[idx] = [t['symbol'] for t in portfolio['tickers']]
+
+        union = sorted({ticker for tickers in scenario_tickers.values() for ticker in tickers})
+        if not union:
+            return {}
+
+        try:
+            logger.info(f"Prefetching data for {len(union)} ticker(s) across {len(scenario_tickers)} scenario(s)")
+            download_yahoo_data(union, years=5, provider=data_provider)
+            return {
+                idx: download_yahoo_data(tickers, years=5, provider=data_provider)
+                for idx, tickers in scenario_tickers.items()
+            }
+        except Exception as e:
+            logger.warning(f"Prefetch failed, downloading per scenario: {e}")
+            return {}
+
+    def simulate_shared_portfolios(self, scenarios: list[tuple], data_provider=None) -> dict[int, dict]:
+        """
+        Simulate scenarios that received the same portfolio from one set of
+        bootstrap paths sampled for the longest horizon.
+
+        Returns {scenario index: evaluate_portfolio keyword arguments}.
+        Scenarios missing from the result are simulated individually by
+        evaluate_portfolio.
+        """
+        groups = {}
+        for idx, (_, _, _, portfolio) in enumerate(scenarios):
+            valid, _ = validate_portfolio(portfolio)
+            if valid:
+                groups.setdefault(json.dumps(portfolio, sort_keys=True), []).append(idx)
+
+        shared = {}
+        for indices in groups.values():
+            portfolio = scenarios[indices[0]][3]
+            tickers = [t['symbol'] for t in portfolio['tickers']]
+            try:
+                goal_params_list = [
+                    resolve_goal_params(scenarios[i][2], scenarios[i][0]) for i in indices
+                ]
+                logger.info(f"Simulating {len(indices)} scenario(s) on shared paths for {tickers}")
+                historical_returns = download_yahoo_data(tickers, years=5, provider=data_provider)
+                results = run_simulation_horizons(goal_params_list, portfolio, historical_returns)
+            except Exception as e:
+                logger.warning(f"Shared simulation failed for {tickers}: {e}")
+                continue
+
+            for i, simulation_results in zip(indices, results):
+                shared[i] = {
+                    "historical_returns": historical_returns,
+                    "simulation_results": simulation_results
+                }
+
+        return shared
+
     async def evaluate_portfolio(
         self,
         goal: str,
         portfolio: dict,
-        config: dict = None
+        config: dict = None,
+        historical_returns=None,
+        simulation_results: dict = None,
+        analytic_mode: str = "off",
+        include_sensitivity: bool = False,
+        include_regret: bool = False,
+        data_provider=None
     ) -> PortfolioEvaluation:
-        """Evaluate a portfolio recommendation using quantitative Monte Carlo simulation"""
+        """
+        Evaluate a portfolio recommendation using quantitative Monte Carlo simulation.
 
-        try:
-            # Parse goal parameters from natural language
-            goal_params = parse_goal(goal)
+        historical_returns and simulation_results may be supplied when they
+        were already computed for this scenario (e.g. shared horizon paths).
+        Otherwise data comes from data_provider (default: the configured
+        market data provider).
+
+        analytic_mode "report" adds the closed-form success estimate next to
+        the bootstrap result and flags large discrepancies; "prescreen" also
+        skips the bootstrap when the estimate is decisive.
+
+        include_sensitivity adds a table of success probability over a grid
+        of monthly contributions and timelines around the goal; its cell for
+        the goal itself shows the headline probability.
+
+        include_regret sweeps reweightings of the portfolio's tickers and
+        reports the best achievable success probability and the regret of
+        the submitted weights against it. The sweep takes seconds, so it
+        runs in a worker thread to keep the event loop responsive.
 
-            # Override with structured config if available
-            if config:
-                goal_params['starting_wealth'] = config.get('starting_amount', goal_params['starting_wealth'])
-                goal_params['target_wealth'] = config.get('target_amount', goal_params['target_wealth'])
-                goal_params['timeline_years'] = config.get('timeline_years', goal_params['timeline_years'])
-                goal_params['monthly_contribution'] = config.get('monthly_contribution', goal_params['monthly_contribution'])
+        Every evaluation also replays each historical window of the returns
+        as a deterministic stress test next to the Monte Carlo result.
+        """
+
+        try:
+            goal_params = resolve_goal_params(goal, config)
 
             logger.info(f"Parsed goal: {goal_params}")
 
@@ -313,12 +528,26 @@ class PortfolioEvaluator(GreenAgent):
                             concerns.append(cached_info['warning_message'])
 
             # Download historical data
-            logger.info(f"Downloading data for tickers: {tickers}")
-            historical_returns = download_yahoo_data(tickers, years=5)
+            if historical_returns is None:
+                logger.info(f"Downloading data for tickers: {tickers}")
+                historical_returns = download_yahoo_data(tickers, years=5, provider=data_provider)
+
+            # Closed-form estimate (microseconds)
+            analytic_probability = None
+            if analytic_mode in ("report", "prescreen"):
+                analytic_results = estimate_success_analytic(goal_params, portfolio, historical_returns)
+                analytic_probability = analytic_results['probability_of_success']
+                decisive = not (
+                    ANALYTIC_PRESCREEN_BOUNDS[0] < analytic_probability < ANALYTIC_PRESCREEN_BOUNDS[1]
+                )
+                if analytic_mode == "prescreen" and decisive and simulation_results is None:
+                    logger.info(f"Analytic pre-screen decisive ({analytic_probability:.1f}%), skipping simulation")
+                    simulation_results = analytic_results
 
             # Run simulation
-            logger.info("Running Monte Carlo simulation...")
-            simulation_results = run_simulation(goal_params, portfolio, historical_returns)
+            if simulation_results is None:
+                logger.info("Running Monte Carlo simulation...")
+                simulation_results = run_simulation(goal_params, portfolio, historical_returns)
 
             # Compute scores with financial sanity checks
             scores = compute_scores(
@@ -329,6 +558,28 @@ class PortfolioEvaluator(GreenAgent):
                 concerns
             )
 
+            historical_replay = replay_historical_windows(goal_params, portfolio, historical_returns)
+
+            sensitivity = None
+            if include_sensitivity:
+                sensitivity = build_sensitivity_table(
+                    goal_params, portfolio, historical_returns, scores['probability_of_success']
+                )
+
+            sweep = None
+            if include_regret:
+                sweep = await asyncio.to_thread(sweep_candidate_weights, goal_params, portfolio, historical_returns)
+
+            discrepancy_flagged = False
+            if analytic_probability is not None:
+                discrepancy = abs(analytic_probability - simulation_results['probability_of_success'])
+                discrepancy_flagged = discrepancy > ANALYTIC_DISCREPANCY_THRESHOLD
+                if discrepancy_flagged:
+                    logger.warning(
+                        f"Analytic estimate {analytic_probability:.1f}% differs from bootstrap "
+                        f"{simulation_results['probability_of_success']:.1f}% by {discrepancy:.1f}pp"
+                    )
+
             return PortfolioEvaluation(
                 probability_of_success=scores['probability_of_success'],
                 diversification_score=scores['diversification_score'],
@@ -336,7 +587,13 @@ class PortfolioEvaluator(GreenAgent):
                 return_score=scores['return_score'],
                 reasoning=scores['reasoning'],
                 concerns=scores['concerns'],
-                overall_assessment=f"{scores['probability_of_success']:.1f}% probability of success"
+                overall_assessment=f"{scores['probability_of_success']:.1f}% probability of success",
+                analytic_probability=round(analytic_probability, 1) if analytic_probability is not None else None,
+                analytic_discrepancy_flagged=discrepancy_flagged,
+                sensitivity=sensitivity,
+                historical_replay=historical_replay,
+                best_achievable_probability=round(sweep['best_probability'], 1) if sweep is not None else None,
+                regret_vs_best=round(sweep['regret'], 1) if sweep is not None else None
             )
 
         except Exception as e:
@@ -396,5 +653,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
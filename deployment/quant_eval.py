@@ -8,7 +8,16 @@ enforces financial sanity checks.
 
 import json
 import hashlib
+import itertools
+import math
+import os
 import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from statistics import NormalDist
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
@@ -22,9 +31,41 @@ from sklearn.covariance import LedoitWolf
 # Configuration
 CACHE_DIR = Path(__file__).parent / "ticker_cache"
 CACHE_TTL_DAYS = 30
+PRICE_STORE_DIR = Path(__file__).parent / "price_store"  # per-ticker monthly closes
+RETURNS_CACHE_TTL_SECONDS = 6 * 3600  # in-process reuse of a downloaded returns matrix
+RETURNS_CACHE_MAX_MB = 64  # in-process returns cache size limit
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yahoo")  # default provider name
+MARKET_DATA_SNAPSHOT_DIR = Path(os.environ.get(
+    "MARKET_DATA_SNAPSHOT_DIR", Path(__file__).parent / "market_snapshot"
+))  # per-ticker CSV closes for the snapshot provider
+SYNTHETIC_END_DATE = datetime(2024, 12, 1)  # last bar of the synthetic provider
+SYNTHETIC_PROFILES = {  # monthly return mean and volatility of synthetic tickers
+    'stock': (0.008, 0.045),
+    'bond': (0.003, 0.012),
+    'leveraged': (0.02, 0.15),
+}
+SYNTHETIC_BOND_TICKERS = {
+    'BND', 'BNDX', 'AGG', 'TLT', 'IEF', 'SHY', 'TIP', 'LQD', 'HYG', 'MUB',
+    'VGIT', 'VGLT', 'VGSH', 'SCHZ', 'GOVT'
+}
 YEARS_OF_HISTORY = 5
 NUM_SIMULATION_PATHS = 3000
 BLOCK_SIZE = 6  # months for block bootstrap
+SIMULATION_MEMORY_LIMIT_MB = 256  # working-memory ceiling for one simulation chunk
+SIMULATION_SHARD_PATHS = 10000  # paths per independently seeded shard in parallel mode
+ADAPTIVE_PATH_INCREMENT = 500  # paths added per step in adaptive mode
+CONFIDENCE_Z = 1.96  # z-score for the 95% success-probability confidence interval
+SAMPLERS = ('random', 'antithetic', 'stratified')  # block-start selection schemes
+QUANTILE_SKETCH_ACCURACY = 0.005  # relative error of streamed wealth percentiles
+SIMULATION_CACHE_ENTRIES = 512  # in-process LRU size for simulation summaries
+SIMULATION_CACHE_DIR = Path(__file__).parent / "simulation_cache"
+SIMULATION_CACHE_MAX_MB = 64  # on-disk simulation cache size limit
+SIMULATION_DISK_CACHE = os.environ.get("SIMULATION_DISK_CACHE", "").lower() in ("1", "true", "yes")
+ANALYTIC_DISCREPANCY_THRESHOLD = 5.0  # pp gap between analytic and bootstrap probability to flag
+ANALYTIC_PRESCREEN_BOUNDS = (0.1, 99.9)  # analytic probabilities treated as decisive in pre-screen
+SWEEP_NUM_CANDIDATES = 2000  # candidate weightings per best-achievable sweep
+SWEEP_GRID_STEP = 5  # percent step of the exhaustive weight grid, when it fits in SWEEP_NUM_CANDIDATES
+REBALANCE_PERIODS = {'monthly': 1, 'quarterly': 3, 'annual': 12, 'never': None}  # months between rebalances
 
 # Financial bounds
 STOCK_RETURN_BOUNDS = (0.04, 0.15)  # 4-15% annual
@@ -118,15 +159,45 @@ def parse_goal(goal_text: str) -> dict:
     return params
 
 
-def download_yahoo_data(tickers: list[str], years: int = YEARS_OF_HISTORY) -> pd.DataFrame:
+def download_yahoo_data(
+    tickers: list[str],
+    years: int = YEARS_OF_HISTORY,
+    provider: Optional["MarketDataProvider"] = None
+) -> pd.DataFrame:
     """
     Download historical adjusted close prices from Yahoo Finance.
     Returns DataFrame of monthly returns for each ticker.
+
+    provider replaces Yahoo Finance as the source of closes (default:
+    get_market_data_provider(), selected by MARKET_DATA_PROVIDER), e.g. an
+    on-disk snapshot or synthetic data for offline runs.
+
+    Yahoo closes come from price_store, which only fetches the months it
+    does not hold yet, so repeated calls are served from disk. Within a
+    process, the closes of a ticker set are reused from returns_cache for
+    the rest of the calendar month (up to its TTL), also for any subset of
+    the tickers. Concurrent calls share in-flight Yahoo requests for the
+    same tickers through download_flights.
     """
 
-    # Download data
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=years*365)
+    if provider is None:
+        provider = get_market_data_provider()
+    month = datetime.now().strftime('%Y-%m')
+
+    prices = returns_cache.get(tickers, years, month, provider.name)
+    if prices is None:
+        prices = provider.monthly_closes(tickers, years)
+        returns_cache.put(tickers, years, month, prices, provider.name)
+
+    # Compute monthly returns on the requested tickers' own bar dates, so a
+    # gap in another ticker of a cached superset cannot remove rows
+    returns = prices[tickers].dropna(how='all').pct_change().dropna()
+
+    return returns
+
+
+def _fetch_yahoo_closes(tickers: list[str], start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """Monthly adjusted closes from Yahoo Finance, one column per ticker."""
 
     data = yf.download(
         tickers,
@@ -152,10 +223,436 @@ def download_yahoo_data(tickers: list[str], years: int = YEARS_OF_HISTORY) -> pd
         # For multiple tickers, Close is multi-level
         prices = data['Close']
 
-    # Compute monthly returns
-    returns = prices.pct_change().dropna()
+    return prices
 
-    return returns
+
+def _fetch_yahoo_closes_coalesced(tickers: list[str], start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """_fetch_yahoo_closes, joining requests already in flight for the same tickers and dates."""
+    return download_flights.fetch(
+        tickers, (start_date.date(), end_date.date()),
+        lambda missing: _fetch_yahoo_closes(missing, start_date, end_date)
+    )
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent fetches per (ticker, window). A caller fetches only
+    the tickers nobody is fetching yet, in one request, and waits for the
+    in-flight requests of the others; every waiter gets the leader's result
+    (or its exception). Finished flights are forgotten, so later calls
+    fetch again.
+
+    Counters (fetches, coalesced) are available via stats(): coalesced
+    counts tickers served by another caller's request.
+    """
+
+    def __init__(self):
+        self._flights = {}  # (ticker, window) -> Future of the fetched frame
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.coalesced = 0
+
+    def fetch(self, tickers: list[str], window: tuple, fetch) -> pd.DataFrame:
+        """Frame with a column per ticker that was returned; fetch(missing) does the request."""
+        with self._lock:
+            joined = {
+                ticker: self._flights[(ticker, window)] for ticker in tickers if (ticker, window) in self._flights
+            }
+            missing = [ticker for ticker in tickers if ticker not in joined]
+            flight = Future()
+            for ticker in missing:
+                self._flights[(ticker, window)] = flight
+            self.coalesced += len(joined)
+            if missing:
+                self.fetches += 1
+
+        if missing:
+            try:
+                flight.set_result(fetch(missing))
+            except BaseException as e:
+                # Also KeyboardInterrupt or a cancellation, so waiters never hang
+                flight.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for ticker in missing:
+                        del self._flights[(ticker, window)]
+
+        columns = []
+        for ticker in tickers:
+            closes = (joined[ticker] if ticker in joined else flight).result()
+            if ticker in closes:
+                columns.append(closes[[ticker]])
+        return pd.concat(columns, axis=1) if columns else pd.DataFrame()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'in_flight': len(self._flights), 'fetches': self.fetches, 'coalesced': self.coalesced}
+
+
+download_flights = SingleFlight()
+
+
+class PriceStore:
+    """
+    On-disk store of monthly adjusted closes: one .npz file per ticker with
+    its bar dates and closes, the earliest date fetched and the time of the
+    last refresh.
+
+    get_prices() fetches only what the files do not cover: history before
+    a ticker's earliest fetch, and the bars since its last refresh (the
+    latest bar, still forming when it was stored, is fetched again and
+    replaced). Tickers refreshed on the day of end_date are served from
+    disk; tickers needing the same range share one fetch. If a fetch fails,
+    tickers that already have stored closes are served from disk, so a
+    warm store works offline.
+
+    Counters (hits, fetches, fetch_errors) are available via stats().
+    """
+
+    def __init__(self, store_dir: Path = PRICE_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def get_prices(self, tickers: list[str], start_date: datetime, end_date: datetime, fetch) -> pd.DataFrame:
+        """
+        Monthly closes for tickers with bar dates in [start_date, end_date],
+        one column per ticker in the given order. fetch(tickers, start, end)
+        returns closes for the missing ranges.
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        records = {ticker: self._read(ticker) for ticker in tickers}
+
+        fetch_groups = {}
+        for ticker, record in records.items():
+            ranges = self._missing_ranges(record, start, end)
+            for fetch_range in ranges:
+                fetch_groups.setdefault(fetch_range, []).append(ticker)
+            if not ranges:
+                with self._lock:
+                    self.hits += 1
+
+        for (fetch_start, fetch_end), group in fetch_groups.items():
+            try:
+                closes = fetch(group, fetch_start.to_pydatetime(), fetch_end.to_pydatetime())
+            except Exception:
+                if any(records[ticker] is None for ticker in group):
+                    raise
+                with self._lock:
+                    self.fetch_errors += 1
+                continue
+            with self._lock:
+                self.fetches += 1
+
+            for ticker in group:
+                new_closes = closes[ticker].dropna() if ticker in closes else pd.Series(dtype=float)
+                if new_closes.empty:
+                    # Nothing returned (unknown ticker or silent failure); do not mark as refreshed
+                    continue
+                refreshed = end if fetch_end == end else None
+                records[ticker] = self._merge(records[ticker], new_closes, fetch_start, refreshed)
+                self._write(ticker, records[ticker])
+
+        prices = pd.DataFrame({
+            ticker: pd.Series(record['closes'], index=pd.to_datetime(record['dates']))
+            for ticker, record in records.items() if record is not None
+        }, columns=tickers)
+        prices.index = pd.DatetimeIndex(prices.index)  # also when nothing is stored
+        return prices[(prices.index >= start) & (prices.index <= end)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'fetches': self.fetches, 'fetch_errors': self.fetch_errors}
+
+    @staticmethod
+    def _missing_ranges(record: Optional[dict], start: pd.Timestamp, end: pd.Timestamp) -> list[tuple]:
+        """Date ranges to fetch so record covers [start, end]."""
+        if record is None:
+            return [(start, end)]
+
+        ranges = []
+        fetched_from = pd.Timestamp(record['fetched_from'])
+        if start < fetched_from:
+            ranges.append((start, fetched_from))
+        if pd.Timestamp(record['refreshed']).date() < end.date():
+            # Re-fetch the latest stored bar, which may have been incomplete
+            last_bar = pd.Timestamp(record['dates'][-1]) if len(record['dates']) else fetched_from
+            ranges.append((last_bar, end))
+        return ranges
+
+    @staticmethod
+    def _merge(
+        record: Optional[dict],
+        closes: pd.Series,
+        fetch_start: pd.Timestamp,
+        refreshed: Optional[pd.Timestamp]
+    ) -> dict:
+        """Combine stored and newly fetched closes; fetched bars replace stored ones."""
+        new_dates = closes.index.values.astype('datetime64[ns]').astype(np.int64)
+        if record is None:
+            return {
+                'dates': new_dates,
+                'closes': closes.values.astype(float),
+                'fetched_from': fetch_start.value,
+                'refreshed': refreshed.value,
+            }
+
+        keep = ~np.isin(record['dates'], new_dates)
+        dates = np.concatenate([record['dates'][keep], new_dates])
+        order = np.argsort(dates, kind='stable')
+        return {
+            'dates': dates[order],
+            'closes': np.concatenate([record['closes'][keep], closes.values.astype(float)])[order],
+            'fetched_from': min(int(record['fetched_from']), fetch_start.value),
+            'refreshed': max(int(record['refreshed']), refreshed.value) if refreshed is not None
+            else int(record['refreshed']),
+        }
+
+    def _read(self, ticker: str) -> Optional[dict]:
+        try:
+            with np.load(self.store_dir / f"{ticker}.npz") as stored:
+                return {
+                    'dates': stored['dates'],
+                    'closes': stored['closes'],
+                    'fetched_from': int(stored['fetched_from']),
+                    'refreshed': int(stored['refreshed']),
+                }
+        except Exception:
+            # Missing or corrupted, fetch from scratch
+            return None
+
+    def _write(self, ticker: str, record: dict) -> None:
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = self.store_dir / f"{ticker}.npz.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_file, 'wb') as f:
+                np.savez(f, **record)
+            os.replace(temp_file, self.store_dir / f"{ticker}.npz")
+        except OSError:
+            # The store is best effort; data is fetched again next time
+            pass
+
+
+price_store = PriceStore()
+
+
+class ReturnsCache:
+    """
+    Process-wide LRU of the monthly closes behind download_yahoo_data's
+    returns, keyed by (sorted ticker set, years, month, data source).
+    Entries expire after ttl_seconds and the least recently used are
+    evicted once the cached frames exceed max_mb.
+
+    Closes are cached rather than returns, so a request for a subset of a
+    cached ticker set is served by column selection and its returns are
+    computed on the subset's own bar dates, as when downloading the subset.
+
+    Counters (hits, subset_hits, misses, expirations, evictions) and the
+    cached size are available via stats().
+    """
+
+    def __init__(self, ttl_seconds: float = RETURNS_CACHE_TTL_SECONDS, max_mb: float = RETURNS_CACHE_MAX_MB):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> (closes, size in bytes, expiry time)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.subset_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, tickers: list[str], years: int, month: str, source: str = "yahoo") -> Optional[pd.DataFrame]:
+        """Closes for tickers (columns in the given order), or None."""
+        requested = set(tickers)
+        key = (tuple(sorted(requested)), years, month, source)
+        with self._lock:
+            self._expire()
+            if key in self._entries:
+                self.hits += 1
+            else:
+                key = next((
+                    cached_key for cached_key in reversed(self._entries)
+                    if cached_key[1:] == (years, month, source) and requested <= set(cached_key[0])
+                ), None)
+                if key is None:
+                    self.misses += 1
+                    return None
+                self.subset_hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0][list(tickers)]
+
+    def put(
+        self,
+        tickers: list[str],
+        years: int,
+        month: str,
+        closes: pd.DataFrame,
+        source: str = "yahoo"
+    ) -> None:
+        key = (tuple(sorted(set(tickers))), years, month, source)
+        size = int(closes.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (closes.copy(), size, time.monotonic() + self.ttl_seconds)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.subset_hits = self.misses = self.expirations = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'subset_hits': self.subset_hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+            }
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (_, _, expiry) in self._entries.items() if expiry <= now]:
+            self.bytes -= self._entries.pop(key)[1]
+            self.expirations += 1
+
+
+returns_cache = ReturnsCache()
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of monthly adjusted closes for download_yahoo_data.
+
+    Subclasses implement monthly_closes(tickers, years), returning closes
+    with bar dates as a DatetimeIndex and one column per ticker, in order.
+    name identifies the data source in the returns cache.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def monthly_closes(self, tickers: list[str], years: int) -> pd.DataFrame:
+        pass
+
+
+class YahooProvider(MarketDataProvider):
+    """Live Yahoo Finance closes through the price store and single-flight downloads."""
+
+    name = "yahoo"
+
+    def monthly_closes(self, tickers: list[str], years: int) -> pd.DataFrame:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=years*365)
+        return price_store.get_prices(tickers, start_date, end_date, _fetch_yahoo_closes_coalesced)
+
+
+class SnapshotProvider(MarketDataProvider):
+    """
+    Closes replayed from an on-disk snapshot: one {ticker}.csv per ticker
+    with date and close columns (see save_market_data_snapshot). The
+    window ends at the snapshot's latest bar rather than today, so results
+    do not change as the snapshot ages.
+    """
+
+    def __init__(self, snapshot_dir: Path = MARKET_DATA_SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.name = f"snapshot:{self.snapshot_dir.resolve()}"
+
+    def monthly_closes(self, tickers: list[str], years: int) -> pd.DataFrame:
+        closes = {}
+        for ticker in tickers:
+            snapshot_file = self.snapshot_dir / f"{ticker}.csv"
+            if not snapshot_file.exists():
+                raise ValueError(f"No snapshot data for {ticker} in {self.snapshot_dir}")
+            closes[ticker] = pd.read_csv(snapshot_file, index_col='date', parse_dates=['date'])['close']
+
+        prices = pd.DataFrame(closes, columns=tickers)
+        start_date = prices.index.max() - timedelta(days=years*365)
+        return prices[prices.index >= start_date]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic generated closes for offline tests and benchmarks, on a
+    fixed calendar ending at SYNTHETIC_END_DATE. Each ticker's returns are
+    normal shocks seeded from its symbol, standardized over the window and
+    scaled to the SYNTHETIC_PROFILES mean and volatility of its class
+    (leveraged ETF, bond fund or stock), so sample statistics match the
+    profile exactly.
+    """
+
+    name = "synthetic"
+
+    def monthly_closes(self, tickers: list[str], years: int) -> pd.DataFrame:
+        start_date = SYNTHETIC_END_DATE - timedelta(days=years*365)
+        dates = pd.date_range(start=start_date, end=SYNTHETIC_END_DATE, freq='MS')
+        closes = {}
+        for ticker in tickers:
+            if ticker in LEVERAGED_PATTERNS:
+                mean, vol = SYNTHETIC_PROFILES['leveraged']
+            elif ticker in SYNTHETIC_BOND_TICKERS:
+                mean, vol = SYNTHETIC_PROFILES['bond']
+            else:
+                mean, vol = SYNTHETIC_PROFILES['stock']
+            rng = np.random.RandomState(int(hashlib.md5(ticker.encode()).hexdigest()[:8], 16))
+            shocks = rng.standard_normal(len(dates) - 1)
+            monthly_returns = mean + vol * (shocks - shocks.mean()) / shocks.std(ddof=1)
+            closes[ticker] = 100 * np.concatenate([[1.0], np.cumprod(1 + monthly_returns)])
+
+        return pd.DataFrame(closes, index=dates, columns=tickers)
+
+
+MARKET_DATA_PROVIDERS = {
+    'yahoo': YahooProvider,
+    'snapshot': SnapshotProvider,
+    'synthetic': SyntheticProvider,
+}
+
+
+def get_market_data_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    Provider registered under name in MARKET_DATA_PROVIDERS (default:
+    MARKET_DATA_PROVIDER, read from the environment at import, else
+    'yahoo'). The snapshot provider reads MARKET_DATA_SNAPSHOT_DIR.
+    """
+    if name is None:
+        name = MARKET_DATA_PROVIDER
+    if name not in MARKET_DATA_PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name}")
+    return MARKET_DATA_PROVIDERS[name]()
+
+
+def save_market_data_snapshot(
+    tickers: list[str],
+    snapshot_dir: Path = MARKET_DATA_SNAPSHOT_DIR,
+    years: int = YEARS_OF_HISTORY,
+    provider: Optional[MarketDataProvider] = None
+) -> None:
+    """Write closes from provider (default: Yahoo) as a snapshot for SnapshotProvider."""
+    if provider is None:
+        provider = YahooProvider()
+    prices = provider.monthly_closes(tickers, years)
+
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    for ticker in tickers:
+        closes = prices[ticker].dropna().rename('close')
+        closes.index.name = 'date'
+        closes.to_csv(snapshot_dir / f"{ticker}.csv")
 
 
 def compute_covariance(returns: pd.DataFrame) -> np.ndarray:
@@ -177,16 +674,98 @@ def run_simulation(
     goal_params: dict,
     portfolio: dict,
     historical_returns: pd.DataFrame,
-    num_paths: int = NUM_SIMULATION_PATHS
+    num_paths: int = NUM_SIMULATION_PATHS,
+    engine: str = 'monthly',
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    workers: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+    tolerance: Optional[float] = None,
+    sampler: str = 'random',
+    return_terminal_wealths: bool = False,
+    dtype: type = np.float64,
+    use_cache: bool = True,
+    resampler: str = 'legacy'
 ) -> dict:
     """
     Run block bootstrap Monte Carlo simulation.
 
+    engine selects the wealth recurrence:
+    - 'monthly': draws a block start for every month and advances wealth
+      one month at a time (the original scheme, reproduced bit for bit)
+    - 'block': draws whole blocks of BLOCK_SIZE months and advances wealth
+      one block at a time from precomputed per-block growth tables
+
+    Paths are simulated in chunks of chunk_size paths (derived from
+    max_memory_mb when not given), so the working set stays bounded for
+    any num_paths. Draws are path-major, so with the 'random' sampler
+    results do not depend on the chunk size.
+
+    workers enables sharded mode: paths are split into shards of
+    SIMULATION_SHARD_PATHS, each with its own stream spawned from the
+    deterministic seed via np.random.SeedSequence, and shards run on a
+    process pool of that many workers (-1 for all cores). The shard layout
+    depends only on num_paths, so results are identical for any worker
+    count, but differ from the single-stream default (workers=None).
+
+    rng supplies the random stream explicitly. By default a private
+    np.random.RandomState seeded from simulation_seed() is created for
+    each call, which reproduces the original global-seed stream without
+    touching global state, so concurrent simulations cannot interfere.
+    A caller-supplied RandomState or Generator is consumed in place (in
+    sharded mode it only seeds the shard spawn tree).
+
+    tolerance enables adaptive mode: paths are simulated in increments of
+    ADAPTIVE_PATH_INCREMENT from the same stream until the 95% Wilson
+    interval on probability_of_success is at most tolerance percentage
+    points wide, with num_paths as the budget. With the 'random' sampler
+    the paths used are a prefix of the full-budget run.
+
+    sampler selects how block starts are drawn:
+    - 'random': independent uniform draws (the original scheme)
+    - 'antithetic': half the paths are drawn uniformly, the other half
+      take the block of mirrored return rank, giving negatively
+      correlated path pairs
+    - 'stratified': every month's starts are spread evenly over the
+      return-ranked blocks (Latin hypercube across paths)
+    Both variance-reduced samplers keep the bootstrap distribution and
+    need fewer paths for the same precision. Pairs and strata are formed
+    within each chunk (each increment in adaptive mode), so their results
+    depend on the chunk size, and adaptive runs are not a prefix of the
+    full-budget run.
+
+    resampler names an entry of RESAMPLERS that generates the month-index
+    matrix for the 'monthly' engine: 'legacy' (the original scheme, which
+    the samplers above modify), 'moving_block', 'circular' or
+    'stationary'. Every resampler builds whole index matrices in bulk.
+
+    Results are streamed chunk by chunk into a WealthAccumulator: success
+    counts are exact and percentiles come from a mergeable quantile sketch
+    (within QUANTILE_SKETCH_ACCURACY relative error), so memory does not
+    grow with num_paths. With return_terminal_wealths=True every terminal
+    wealth is retained, returned, and percentiles are computed exactly.
+
+    dtype=np.float32 runs the return tables and wealth paths in single
+    precision and draws the month indices as int32, halving the memory of
+    a chunk (chunks are sized for the smaller indices). Success
+    probabilities are reported to one decimal, which single precision
+    resolves. The first run with a reduced-precision dtype in a process
+    runs verify_reduced_precision(), and the dtype is refused with a
+    ValueError if any reference score changes.
+
+    Summaries of seeded runs are memoized in simulation_cache, keyed by the
+    deterministic seed string, the numeric goal parameters, a hash of the
+    returns data and every option that changes the result (including the
+    chunk size for the variance-reduced samplers). Runs with an
+    explicit rng or return_terminal_wealths=True are never cached.
+
     Returns dict with:
-    - terminal_wealths: Array of final wealth values
+    - terminal_wealths: Array of final wealth values (only when requested)
     - probability_of_success: Percentage achieving goal
     - median_wealth: Median terminal wealth
     - percentiles: Various percentile values
+    - num_paths_used: Number of simulated paths
+    - ci_width: Width of the 95% confidence interval on probability_of_success
     """
 
     # Extract parameters
@@ -201,43 +780,672 @@ def run_simulation(
 
     # Ensure returns match tickers
     returns = historical_returns[tickers]
-    n_months = len(returns)
 
     # Compute portfolio returns
-    portfolio_returns = (returns * weights).sum(axis=1).values
+    portfolio_returns = (returns * weights).sum(axis=1).values.astype(dtype)
 
     # Deterministic seed for reproducibility
-    seed_str = f"{goal_params['goal_description']}{json.dumps(portfolio, sort_keys=True)}{num_paths}"
-    seed = int(hashlib.md5(seed_str.encode()).hexdigest(), 16) % (2**32)
-    np.random.seed(seed)
+    seed = simulation_seed(goal_params, portfolio, num_paths)
+
+    if engine not in ('monthly', 'block'):
+        raise ValueError(f"Unknown simulation engine: {engine}")
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown block sampler: {sampler}")
+    if resampler not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {resampler}")
+    if resampler != 'legacy' and (engine != 'monthly' or sampler != 'random'):
+        raise ValueError("Only the legacy resampler supports the block engine and variance-reduced samplers")
+    if np.dtype(dtype) != np.float64:
+        _check_reduced_precision(dtype)
 
-    # Run simulations
-    terminal_wealths = []
     num_months = T * 12
+    if chunk_size is None:
+        chunk_size = _chunk_size_for_memory(num_months, max_memory_mb, dtype)
+
+    # Reuse the summary of an identical earlier run
+    cache_key = None
+    if use_cache and rng is None and not return_terminal_wealths:
+        cache_key = _simulation_cache_key(
+            goal_params, portfolio, num_paths, returns.values,
+            engine=engine, sampler=sampler, resampler=resampler, dtype=np.dtype(dtype).name,
+            tolerance=tolerance,
+            shard_paths=SIMULATION_SHARD_PATHS if workers is not None else None,
+            adaptive_increment=ADAPTIVE_PATH_INCREMENT if tolerance is not None else None,
+            # Pairs and strata are formed per chunk; random draws do not depend on it
+            chunk_size=chunk_size if sampler != 'random' else None,
+        )
+        cached = simulation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Run simulations chunk by chunk
+    if tolerance is not None:
+        if workers is not None:
+            raise ValueError("Adaptive mode runs on a single stream; use workers=None")
+        if rng is None:
+            rng = np.random.RandomState(seed)
+        accumulator = WealthAccumulator(W_star, keep_values=return_terminal_wealths)
+        _simulate_adaptive(
+            engine, portfolio_returns, num_months, num_paths, W0, C, rng, chunk_size, tolerance,
+            accumulator, sampler, resampler
+        )
+    elif workers is None:
+        if rng is None:
+            rng = np.random.RandomState(seed)
+        accumulator = WealthAccumulator(W_star, keep_values=return_terminal_wealths)
+        for chunk_wealths in _iter_simulated_chunks(
+            engine, portfolio_returns, num_months, num_paths, W0, C, rng, chunk_size, sampler, resampler
+        ):
+            accumulator.update(chunk_wealths)
+    else:
+        if rng is not None:
+            seed = int(_draw_integers(rng, 0, 2**63, ()))
+        accumulator = _simulate_sharded(
+            engine, portfolio_returns, num_months, num_paths, W0, C, W_star, seed, chunk_size, workers,
+            return_terminal_wealths, sampler, resampler
+        )
 
-    for _ in range(num_paths):
-        wealth = W0
+    results = accumulator.summary()
+    if cache_key is not None:
+        simulation_cache.put(cache_key, results)
+    return results
 
-        # Block bootstrap sampling
-        for month in range(num_months):
-            # Sample a block starting point
-            if n_months > BLOCK_SIZE:
-                block_start = np.random.randint(0, n_months - BLOCK_SIZE + 1)
-                block_idx = month % BLOCK_SIZE
-                sampled_return = portfolio_returns[block_start + block_idx]
-            else:
-                # If not enough history, use standard bootstrap
-                sampled_return = portfolio_returns[np.random.randint(0, n_months)]
 
-            # Apply return and add contribution
-            wealth = wealth * (1 + sampled_return) + C
+def run_simulation_batch(
+    goal_params: dict,
+    tickers: list[str],
+    weights: np.ndarray,
+    historical_returns: pd.DataFrame,
+    num_paths: int = NUM_SIMULATION_PATHS,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None
+) -> list[dict]:
+    """
+    Simulate many portfolios over the same tickers with common random numbers.
+
+    weights is a (portfolios x tickers) matrix of fractional allocations.
+    All portfolio return series come from one matrix product, and a single
+    block-index matrix is shared by every portfolio, so differences between
+    portfolios are not blurred by sampling noise.
+
+    Returns one run_simulation-style result dict per row of weights.
+    """
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    portfolio_returns = historical_returns[tickers].values @ weights.T
+    n_months, num_portfolios = portfolio_returns.shape
+
+    if rng is None:
+        rng = np.random.RandomState(simulation_seed(goal_params, {'tickers': sorted(tickers)}, num_paths))
+    if chunk_size is None:
+        # Index matrix plus one wealth column per portfolio
+        chunk_size = _chunk_size_for_memory(num_months + num_portfolios, max_memory_mb)
+
+    terminal_wealths = np.empty((num_paths, num_portfolios))
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(n_months, num_months, chunk_paths, rng)
+        terminal_wealths[chunk_start:chunk_start + chunk_paths] = _simulate_terminal_wealths(
+            portfolio_returns, block_indices, W0, C
+        )
+
+    return [
+        _summarize_terminal_wealths(terminal_wealths[:, i], W_star)
+        for i in range(num_portfolios)
+    ]
+
+
+def sweep_candidate_weights(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    num_candidates: int = SWEEP_NUM_CANDIDATES,
+    grid_step: int = SWEEP_GRID_STEP,
+    num_paths: int = NUM_SIMULATION_PATHS,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None
+) -> dict:
+    """
+    Best success probability achievable by reweighting the portfolio's own
+    tickers, as a benchmark for the submitted allocation.
+
+    Candidates are every weighting on a grid_step percent grid when that
+    grid has at most num_candidates points, otherwise the single-ticker
+    portfolios plus uniform (Dirichlet) samples of the simplex. All
+    candidate return series come from one matrix product, and every
+    candidate - including the submitted weights - is simulated on the same
+    bootstrap indices, so the regret is not blurred by sampling noise.
+    Only success counts are kept per candidate.
+
+    Returns dict with:
+    - best_probability: Highest success probability over the candidates
+    - best_weights: {ticker: allocation percent} of the best candidate
+    - portfolio_probability: Success probability of the submitted weights
+    - regret: best_probability - portfolio_probability (percentage points)
+    - num_candidates: Number of weightings simulated
+    """
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    seed = simulation_seed(goal_params, {'tickers': sorted(tickers)}, num_paths)
+
+    candidates = np.vstack([weights, _candidate_weights(len(tickers), num_candidates, grid_step, seed)])
+    portfolio_returns = historical_returns[tickers].values @ candidates.T
+    n_months = len(portfolio_returns)
+
+    if rng is None:
+        rng = np.random.RandomState(seed)
+    if chunk_size is None:
+        # Index matrix plus one wealth column per candidate
+        chunk_size = _chunk_size_for_memory(num_months + len(candidates), max_memory_mb)
+
+    successes = np.zeros(len(candidates), dtype=np.int64)
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(n_months, num_months, chunk_paths, rng)
+        successes += (_simulate_terminal_wealths(portfolio_returns, block_indices, W0, C) >= W_star).sum(axis=0)
+
+    probabilities = successes / num_paths * 100
+    best = int(np.argmax(probabilities))
+
+    return {
+        'best_probability': float(probabilities[best]),
+        'best_weights': {ticker: round(float(w) * 100, 1) for ticker, w in zip(tickers, candidates[best])},
+        'portfolio_probability': float(probabilities[0]),
+        'regret': float(probabilities[best] - probabilities[0]),
+        'num_candidates': len(candidates) - 1,
+    }
+
+
+def _candidate_weights(num_tickers: int, num_candidates: int, grid_step: int, seed: int) -> np.ndarray:
+    """
+    (candidates x tickers) matrix of weightings on the simplex: the full
+    grid_step percent grid if it has at most num_candidates points, else the
+    single-ticker corners plus seeded uniform samples.
+    """
+    units = 100 // grid_step
+    if math.comb(units + num_tickers - 1, num_tickers - 1) <= num_candidates:
+        # Stars and bars: bar positions split units into num_tickers parts
+        combinations = list(itertools.combinations(range(units + num_tickers - 1), num_tickers - 1))
+        bars = np.array(combinations, dtype=int).reshape(len(combinations), num_tickers - 1)
+        edges = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), units + num_tickers - 1)])
+        return (np.diff(edges, axis=1) - 1) * grid_step / 100
+
+    corners = np.eye(num_tickers)
+    samples = np.random.default_rng(seed).dirichlet(np.ones(num_tickers), max(num_candidates - num_tickers, 0))
+    return np.vstack([corners, samples])
+
+
+def run_simulation_horizons(
+    goal_params_list: list[dict],
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    num_paths: int = NUM_SIMULATION_PATHS,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None
+) -> list[dict]:
+    """
+    Simulate several goals (e.g. retirement, house, college) for the same
+    portfolio from one set of bootstrap paths.
+
+    The block-index matrix is sampled once for the longest horizon; each
+    goal reads its terminal wealth off the prefix of the same paths, with
+    its own starting wealth and contribution applied by the recurrence.
+
+    Returns one run_simulation-style result dict per goal, in input order.
+    """
+
+    W0s = np.array([g['starting_wealth'] for g in goal_params_list], dtype=float)
+    Cs = np.array([g['monthly_contribution'] for g in goal_params_list], dtype=float)
+    horizons = np.array([g['timeline_years'] * 12 for g in goal_params_list])
+    num_months = int(horizons.max()) if len(horizons) else 0
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    portfolio_returns = (historical_returns[tickers] * weights).sum(axis=1).values
+    n_months = len(portfolio_returns)
+
+    if rng is None:
+        combined_goal = {'goal_description': ' | '.join(g['goal_description'] for g in goal_params_list)}
+        rng = np.random.RandomState(simulation_seed(combined_goal, portfolio, num_paths))
+    if chunk_size is None:
+        chunk_size = _chunk_size_for_memory(num_months + len(goal_params_list), max_memory_mb)
+
+    terminal_wealths = np.empty((num_paths, len(goal_params_list)))
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(n_months, num_months, chunk_paths, rng)
+        terminal_wealths[chunk_start:chunk_start + chunk_paths] = _simulate_horizon_wealths(
+            portfolio_returns, block_indices, W0s, Cs, horizons
+        )
+
+    return [
+        _summarize_terminal_wealths(terminal_wealths[:, i], g['target_wealth'])
+        for i, g in enumerate(goal_params_list)
+    ]
+
+
+def _simulate_horizon_wealths(
+    portfolio_returns: np.ndarray,
+    block_indices: np.ndarray,
+    W0s: np.ndarray,
+    Cs: np.ndarray,
+    horizons: np.ndarray
+) -> np.ndarray:
+    """
+    Run the monthly recurrence for several (W0, C) pairs along the same
+    paths and record each one's wealth when its horizon (in months) is
+    reached. Returns a (paths, goals) matrix.
+    """
+    growth = 1 + portfolio_returns
+    wealth = np.tile(W0s, (block_indices.shape[0], 1))
+    terminal_wealths = wealth.copy()
+
+    for month in range(block_indices.shape[1]):
+        wealth = wealth * growth[block_indices[:, month]][:, None] + Cs
+        finished = horizons == month + 1
+        terminal_wealths[:, finished] = wealth[:, finished]
+
+    return terminal_wealths
+
+
+def replay_historical_windows(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame
+) -> dict:
+    """
+    Deterministic stress test: replay every contiguous window of the return
+    history as one path, in its original order.
+
+    Windows are strided views (np.lib.stride_tricks.sliding_window_view)
+    over the portfolio return series, so no path matrix is copied. When the
+    history is shorter than the timeline, each window starts at a month of
+    history and wraps around to the beginning, giving one window per month.
+
+    Returns dict with:
+    - probability_of_success: Percentage of windows achieving the goal
+    - num_windows: Number of windows replayed
+    - wrapped: Whether windows wrap around the history
+    - worst_window / median_window: start and terminal_wealth of the
+      windows with the lowest and the median terminal wealth
+    """
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    portfolio_returns = (historical_returns[tickers] * weights).sum(axis=1).values
+    n_months = len(portfolio_returns)
+
+    wrapped = n_months < num_months
+    if wrapped:
+        # Cyclic extension long enough for a window from every start month
+        portfolio_returns = np.resize(portfolio_returns, n_months + num_months - 1)
+    windows = np.lib.stride_tricks.sliding_window_view(1 + portfolio_returns, max(num_months, 1))
+    if wrapped:
+        windows = windows[:n_months]
+
+    wealth = np.full(len(windows), float(W0))
+    for month in range(num_months):
+        wealth = wealth * windows[:, month] + C
+
+    order = np.argsort(wealth, kind='stable')
+
+    def window_summary(position: int) -> dict:
+        start = historical_returns.index[position]
+        return {
+            'start': start.strftime('%Y-%m') if hasattr(start, 'strftime') else str(start),
+            'terminal_wealth': float(wealth[position]),
+        }
+
+    return {
+        'probability_of_success': float((wealth >= W_star).sum() / len(wealth) * 100),
+        'num_windows': len(wealth),
+        'wrapped': wrapped,
+        'worst_window': window_summary(order[0]),
+        'median_window': window_summary(order[len(order) // 2]),
+    }
+
+
+def simulate_sensitivity(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    monthly_contributions: list[float],
+    timelines_years: list[int],
+    num_paths: int = NUM_SIMULATION_PATHS,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None
+) -> dict:
+    """
+    probability_of_success over a grid of monthly contributions x timelines.
+
+    For fixed sampled returns, terminal wealth is linear in the contribution:
+    W_T = W0 * G_T + C * A_T, where G_T is the path's growth factor and A_T
+    the compounded value of a unit monthly contribution. One set of paths is
+    sampled for the longest timeline; G_T and A_T are read off every
+    timeline's prefix, and all contributions are scored in one broadcast.
+
+    Returns dict with:
+    - monthly_contributions, timelines_years: the grid axes
+    - probability_of_success: (contributions x timelines) array of percentages
+    """
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    contributions = np.asarray(monthly_contributions, dtype=float)
+    horizons = np.asarray(timelines_years, dtype=int) * 12
+    num_months = int(horizons.max()) if len(horizons) else 0
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    portfolio_returns = (historical_returns[tickers] * weights).sum(axis=1).values
+    n_months = len(portfolio_returns)
+
+    if rng is None:
+        rng = np.random.RandomState(simulation_seed(goal_params, portfolio, num_paths))
+    if chunk_size is None:
+        chunk_size = _chunk_size_for_memory(num_months + 2 * len(horizons), max_memory_mb)
+
+    successes = np.zeros((len(contributions), len(horizons)))
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(n_months, num_months, chunk_paths, rng)
+        growth, annuity = _path_growth_factors(portfolio_returns, block_indices, horizons)
+        for h in range(len(horizons)):
+            wealth = W0 * growth[:, h] + contributions[:, None] * annuity[:, h]
+            successes[:, h] += (wealth >= W_star).sum(axis=1)
+
+    return {
+        'monthly_contributions': contributions.tolist(),
+        'timelines_years': [int(t) for t in timelines_years],
+        'probability_of_success': successes / num_paths * 100,
+    }
+
+
+def solve_required_contribution(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    target_probability: float = 80.0,
+    solve_for: str = 'monthly_contribution',
+    num_paths: int = NUM_SIMULATION_PATHS,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None
+) -> dict:
+    """
+    Minimum monthly contribution (or starting wealth) that reaches the goal
+    with at least target_probability percent success.
+
+    Each path's growth factor G and unit-contribution annuity A are computed
+    once. A path succeeds iff W0 * G + C * A >= W*, i.e. iff C is at least
+    its threshold (W* - W0 * G) / A (or W0 at least (W* - C * A) / G), so
+    the answer is the matching order statistic of the per-path thresholds,
+    rounded up to the cent. The other goal parameter stays as given.
+    With a zero timeline wealth stays at W0, so no contribution helps.
+
+    Returns dict with:
+    - solve_for, target_probability
+    - required_value: Minimum value (None if unreachable)
+    - achieved_probability: Success probability at required_value
+    """
+
+    if solve_for not in ('monthly_contribution', 'starting_wealth'):
+        raise ValueError(f"Cannot solve for: {solve_for}")
+    if not 0 <= target_probability <= 100:
+        raise ValueError(f"target_probability must be between 0 and 100, got {target_probability}")
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    if num_months == 0:
+        # Terminal wealth is the starting wealth on every path
+        if solve_for == 'monthly_contribution':
+            achieved = 100.0 if W0 >= W_star else 0.0
+            required = 0.0 if achieved >= target_probability else None
+        else:
+            required = float(np.ceil(max(W_star, 0.0) * 100) / 100) if target_probability > 0 else 0.0
+            achieved = 100.0 if required >= W_star else 0.0
+        return {
+            'solve_for': solve_for,
+            'target_probability': target_probability,
+            'required_value': required,
+            'achieved_probability': achieved,
+        }
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    portfolio_returns = (historical_returns[tickers] * weights).sum(axis=1).values
+    n_months = len(portfolio_returns)
+
+    if rng is None:
+        rng = np.random.RandomState(simulation_seed(goal_params, portfolio, num_paths))
+    if chunk_size is None:
+        chunk_size = _chunk_size_for_memory(num_months, max_memory_mb)
+
+    growth = np.empty(num_paths)
+    annuity = np.empty(num_paths)
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(n_months, num_months, chunk_paths, rng)
+        chunk_growth, chunk_annuity = _path_growth_factors(
+            portfolio_returns, block_indices, np.array([num_months])
+        )
+        growth[chunk_start:chunk_start + chunk_paths] = chunk_growth[:, 0]
+        annuity[chunk_start:chunk_start + chunk_paths] = chunk_annuity[:, 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if solve_for == 'monthly_contribution':
+            thresholds = np.where(annuity > 0, (W_star - W0 * growth) / annuity, np.inf)
+        else:
+            thresholds = np.where(growth > 0, (W_star - C * annuity) / growth, np.inf)
+    thresholds = np.where(np.isnan(thresholds), np.inf, thresholds)
+
+    # Smallest value at which at least k paths succeed (tolerance keeps whole counts exact)
+    k = math.ceil(target_probability * num_paths / 100 - 1e-9)
+    required = max(0.0, float(np.sort(thresholds)[k - 1])) if k > 0 else 0.0
+
+    if not np.isfinite(required):
+        return {
+            'solve_for': solve_for,
+            'target_probability': target_probability,
+            'required_value': None,
+            'achieved_probability': float(np.isneginf(thresholds).mean() * 100),
+        }
+
+    required = float(np.ceil(required * 100) / 100)
+    if solve_for == 'monthly_contribution':
+        wealth = W0 * growth + required * annuity
+    else:
+        wealth = required * growth + C * annuity
+
+    return {
+        'solve_for': solve_for,
+        'target_probability': target_probability,
+        'required_value': required,
+        'achieved_probability': float((wealth >= W_star).sum() / num_paths * 100),
+    }
+
+
+def _path_growth_factors(
+    portfolio_returns: np.ndarray,
+    block_indices: np.ndarray,
+    horizons: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-path growth factor G and unit-contribution annuity A after each
+    horizon (in months), so that wealth is W0 * G + C * A for any W0 and C.
+    Returns two (paths, horizons) matrices.
+    """
+    growth_per_month = 1 + portfolio_returns
+    num_paths = block_indices.shape[0]
+    growth = np.ones(num_paths)
+    annuity = np.zeros(num_paths)
+    growth_at = np.ones((num_paths, len(horizons)))
+    annuity_at = np.zeros((num_paths, len(horizons)))
+
+    for month in range(block_indices.shape[1]):
+        monthly_growth = growth_per_month[block_indices[:, month]]
+        growth = growth * monthly_growth
+        annuity = annuity * monthly_growth + 1
+        finished = horizons == month + 1
+        growth_at[:, finished] = growth[:, None]
+        annuity_at[:, finished] = annuity[:, None]
+
+    return growth_at, annuity_at
+
+
+def run_simulation_assets(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    num_paths: int = NUM_SIMULATION_PATHS,
+    rebalance: str = 'monthly',
+    glide_path: Optional[dict] = None,
+    chunk_size: Optional[int] = None,
+    max_memory_mb: float = SIMULATION_MEMORY_LIMIT_MB,
+    rng: Optional[np.random.Generator] = None,
+    sampler: str = 'random',
+    return_terminal_wealths: bool = False
+) -> dict:
+    """
+    Block bootstrap simulation that tracks holdings per asset.
+
+    Instead of collapsing the portfolio to one fixed-weight return series,
+    a (paths x tickers) holdings array is advanced by each asset's own
+    sampled return, so allocations drift between rebalances. Months are
+    sampled exactly as in run_simulation, so with monthly rebalancing and
+    no glide path the results match the single-series engine.
+
+    rebalance is one of REBALANCE_PERIODS: holdings are reset to the
+    target allocation at the end of every such period ('never' lets them
+    drift for the whole timeline). Contributions are always invested at
+    the target allocation.
+
+    glide_path is a portfolio dict (same shape as portfolio) giving the
+    allocation to reach by the end of the timeline; the target moves
+    linearly from portfolio to glide_path month by month, as in a
+    target-date fund. Tickers present in only one of the two are held at
+    0% in the other.
+
+    Returns the same summary as run_simulation.
+    """
+
+    if rebalance not in REBALANCE_PERIODS:
+        raise ValueError(f"Unknown rebalancing schedule: {rebalance}")
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown block sampler: {sampler}")
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    if glide_path is not None:
+        tickers += [t['symbol'] for t in glide_path['tickers'] if t['symbol'] not in tickers]
+    target_weights = _allocation_schedule(portfolio, glide_path, tickers, num_months)
+
+    asset_returns = historical_returns[tickers].values
+    n_months = len(asset_returns)
+    # Ranking series for the variance-reduced samplers
+    portfolio_returns = asset_returns @ target_weights[0]
+
+    if rng is None:
+        rng = np.random.RandomState(simulation_seed(goal_params, portfolio, num_paths))
+    if chunk_size is None:
+        # Index matrix plus the holdings array
+        chunk_size = _chunk_size_for_memory(num_months + len(tickers), max_memory_mb)
+
+    accumulator = WealthAccumulator(W_star, keep_values=return_terminal_wealths)
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        block_indices = _sample_block_indices(
+            n_months, num_months, chunk_paths, rng, sampler, portfolio_returns
+        )
+        accumulator.update(_simulate_asset_wealths(
+            asset_returns, block_indices, target_weights, W0, C, REBALANCE_PERIODS[rebalance]
+        ))
+
+    return accumulator.summary()
+
+
+def _allocation_schedule(
+    portfolio: dict,
+    glide_path: Optional[dict],
+    tickers: list[str],
+    num_months: int
+) -> np.ndarray:
+    """
+    (num_months + 1, tickers) matrix of target weights: row m is the
+    allocation in force after m months, moving linearly from portfolio to
+    glide_path.
+    """
+    def weights_of(allocation: dict) -> np.ndarray:
+        percents = {t['symbol']: t['allocation_percent'] for t in allocation['tickers']}
+        return np.array([percents.get(ticker, 0) / 100 for ticker in tickers])
+
+    start = weights_of(portfolio)
+    end = weights_of(glide_path) if glide_path is not None else start
+    progress = np.arange(num_months + 1)[:, None] / max(num_months, 1)
+    return start + (end - start) * progress
+
+
+def _simulate_asset_wealths(
+    asset_returns: np.ndarray,
+    block_indices: np.ndarray,
+    target_weights: np.ndarray,
+    W0: float,
+    C: float,
+    rebalance_period: Optional[int]
+) -> np.ndarray:
+    """
+    Advance a (paths x tickers) holdings array month by month: every asset
+    grows by its own sampled return, the contribution is split by the
+    current target weights, and holdings are reset to the target at the
+    end of each rebalance_period months. Returns terminal wealth per path.
+
+    Holdings are stored tickers-major (tickers x paths) so each month's
+    gather, contribution and rebalance run over contiguous rows.
+    """
+    asset_growth = np.ascontiguousarray((1 + asset_returns).T)
+    month_indices = np.ascontiguousarray(block_indices.T)
+    weights = target_weights[:, :, None]
+    holdings = np.tile(W0 * weights[0], (1, block_indices.shape[0]))
+
+    for month in range(month_indices.shape[0]):
+        holdings *= asset_growth[:, month_indices[month]]
+        holdings += C * weights[month + 1]
+        if rebalance_period is not None and (month + 1) % rebalance_period == 0:
+            np.multiply(weights[month + 1], holdings.sum(axis=0), out=holdings)
 
-        terminal_wealths.append(wealth)
+    return holdings.sum(axis=0)
 
-    terminal_wealths = np.array(terminal_wealths)
 
-    # Compute statistics
-    probability = (terminal_wealths >= W_star).sum() / num_paths * 100
+def _summarize_terminal_wealths(terminal_wealths: np.ndarray, W_star: float) -> dict:
+    """Success probability and wealth percentiles of simulated terminal wealths."""
+    probability = (terminal_wealths >= W_star).sum() / len(terminal_wealths) * 100
 
     return {
         'terminal_wealths': terminal_wealths,
@@ -247,6 +1455,766 @@ def run_simulation(
         'p25_wealth': np.percentile(terminal_wealths, 25),
         'p75_wealth': np.percentile(terminal_wealths, 75),
         'p90_wealth': np.percentile(terminal_wealths, 90),
+        'num_paths_used': len(terminal_wealths),
+        'ci_width': _success_ci_width((terminal_wealths >= W_star).sum(), len(terminal_wealths)),
+    }
+
+
+def _success_ci_width(successes: int, num_paths: int) -> float:
+    """
+    Width, in percentage points, of the Wilson score interval on the
+    success probability. Unlike the normal approximation it stays positive
+    when every path succeeds or fails.
+    """
+    if num_paths == 0:
+        return 100.0
+
+    z2 = CONFIDENCE_Z ** 2
+    p = successes / num_paths
+    half_width = CONFIDENCE_Z * np.sqrt(p * (1 - p) / num_paths + z2 / (4 * num_paths ** 2))
+    return float(2 * half_width / (1 + z2 / num_paths) * 100)
+
+
+class WealthAccumulator:
+    """
+    Streaming, mergeable summary of simulated terminal wealths.
+
+    Success counts are exact. Percentiles come from a log-bucketed quantile
+    sketch (DDSketch style): each value is counted in the bucket
+    ceil(log_gamma(|x|)), so any quantile is returned within
+    relative_accuracy of the true value while memory depends only on the
+    range of wealths, not on the number of paths. Accumulators from
+    different chunks or workers are combined with merge().
+
+    With keep_values=True the raw values are also retained so summary()
+    can return them with exact percentiles.
+    """
+
+    def __init__(
+        self,
+        target_wealth: float,
+        keep_values: bool = False,
+        relative_accuracy: float = QUANTILE_SKETCH_ACCURACY
+    ):
+        self.target_wealth = target_wealth
+        self.keep_values = keep_values
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self.successes = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        self._positive = {}
+        self._negative = {}
+        self._zero_count = 0
+        self._values = []
+
+    def update(self, terminal_wealths: np.ndarray) -> None:
+        """Add a chunk of terminal wealths."""
+        terminal_wealths = np.asarray(terminal_wealths, dtype=float)
+        self.count += len(terminal_wealths)
+        self.successes += int((terminal_wealths >= self.target_wealth).sum())
+        self._zero_count += int((terminal_wealths == 0).sum())
+        self._add_to_store(self._positive, terminal_wealths[terminal_wealths > 0])
+        self._add_to_store(self._negative, -terminal_wealths[terminal_wealths < 0])
+        if self.keep_values:
+            self._values.append(terminal_wealths)
+
+    def merge(self, other: 'WealthAccumulator') -> None:
+        """Fold another accumulator (same target and accuracy) into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge accumulators with different accuracy")
+        self.count += other.count
+        self.successes += other.successes
+        self._zero_count += other._zero_count
+        for store, other_store in ((self._positive, other._positive), (self._negative, other._negative)):
+            for bucket, bucket_count in other_store.items():
+                store[bucket] = store.get(bucket, 0) + bucket_count
+        if self.keep_values:
+            self._values.extend(other._values)
+
+    def _add_to_store(self, store: dict, magnitudes: np.ndarray) -> None:
+        if len(magnitudes) == 0:
+            return
+        buckets = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        for bucket, bucket_count in zip(*np.unique(buckets, return_counts=True)):
+            store[int(bucket)] = store.get(int(bucket), 0) + int(bucket_count)
+
+    def probability_of_success(self) -> float:
+        """Percentage of paths reaching the target wealth."""
+        return self.successes / self.count * 100 if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1) of the accumulated wealths."""
+        if self.count == 0:
+            return float('nan')
+
+        negative = sorted(self._negative.items(), reverse=True)
+        positive = sorted(self._positive.items())
+        values = np.array(
+            [-self._bucket_value(b) for b, _ in negative] + [0.0] + [self._bucket_value(b) for b, _ in positive]
+        )
+        counts = np.array([c for _, c in negative] + [self._zero_count] + [c for _, c in positive])
+
+        rank = q * (self.count - 1)
+        return float(values[np.searchsorted(np.cumsum(counts), rank, side='right')])
+
+    def _bucket_value(self, bucket: int) -> float:
+        return 2 * self._gamma ** bucket / (self._gamma + 1)
+
+    def terminal_wealths(self) -> np.ndarray:
+        """All accumulated terminal wealths (requires keep_values=True)."""
+        if not self.keep_values:
+            raise ValueError("Terminal wealths were not retained; use keep_values=True")
+        return np.concatenate(self._values) if self._values else np.empty(0)
+
+    def summary(self) -> dict:
+        """run_simulation-style result dict."""
+        if self.keep_values:
+            return _summarize_terminal_wealths(self.terminal_wealths(), self.target_wealth)
+
+        return {
+            'probability_of_success': self.probability_of_success(),
+            'median_wealth': self.quantile(0.5),
+            'p10_wealth': self.quantile(0.10),
+            'p25_wealth': self.quantile(0.25),
+            'p75_wealth': self.quantile(0.75),
+            'p90_wealth': self.quantile(0.90),
+            'num_paths_used': self.count,
+            'ci_width': _success_ci_width(self.successes, self.count),
+        }
+
+
+def _simulation_seed_string(goal_params: dict, portfolio: dict, num_paths: int) -> str:
+    """Canonical key of a simulation request: goal text, sorted portfolio JSON and path count."""
+    return f"{goal_params['goal_description']}{json.dumps(portfolio, sort_keys=True)}{num_paths}"
+
+
+def simulation_seed(goal_params: dict, portfolio: dict, num_paths: int = NUM_SIMULATION_PATHS) -> int:
+    """
+    Deterministic 32-bit seed derived from the goal description, the
+    canonical portfolio JSON and the path count.
+    """
+    seed_str = _simulation_seed_string(goal_params, portfolio, num_paths)
+    return int(hashlib.md5(seed_str.encode()).hexdigest(), 16) % (2**32)
+
+
+def _simulation_cache_key(
+    goal_params: dict,
+    portfolio: dict,
+    num_paths: int,
+    returns_data: np.ndarray,
+    **options
+) -> str:
+    """
+    Cache key for a seeded simulation: the seed string, the numeric goal
+    parameters (config may override the parsed text), a hash of the
+    returns data and the result-affecting options.
+    """
+    returns_data = np.ascontiguousarray(returns_data, dtype=np.float64)
+    returns_hash = hashlib.md5(returns_data.tobytes() + str(returns_data.shape).encode()).hexdigest()
+    goal_values = [goal_params[key] for key in (
+        'starting_wealth', 'target_wealth', 'timeline_years', 'monthly_contribution'
+    )]
+    key_str = (
+        f"{_simulation_seed_string(goal_params, portfolio, num_paths)}|{goal_values}|{returns_hash}|"
+        f"{json.dumps(options, sort_keys=True)}"
+    )
+    return hashlib.md5(key_str.encode()).hexdigest()
+
+
+class SimulationCache:
+    """
+    Memoizes simulation summaries: an in-process LRU of at most max_entries
+    results, optionally backed by one JSON file per key in disk_dir, evicted
+    oldest-first once the directory exceeds max_disk_mb.
+
+    Counters (hits, disk_hits, misses, evictions) are available via stats().
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SIMULATION_CACHE_ENTRIES,
+        disk_dir: Optional[Path] = None,
+        max_disk_mb: float = SIMULATION_CACHE_MAX_MB
+    ):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a copy of the cached summary, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(self._entries[key])
+
+        results = self._read_disk(key)
+        with self._lock:
+            if results is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, results)
+            return dict(results)
+
+    def put(self, key: str, results: dict) -> None:
+        """Store a summary (plain floats only; terminal wealth arrays are dropped)."""
+        results = {
+            name: value.item() if isinstance(value, np.generic) else value
+            for name, value in results.items() if name != 'terminal_wealths'
+        }
+        with self._lock:
+            self._store(key, results)
+        self._write_disk(key, results)
+
+    def clear(self) -> None:
+        """Drop in-process entries and reset the counters (disk files are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _store(self, key: str, results: dict) -> None:
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        if self.disk_dir is None:
+            return None
+        cache_file = self.disk_dir / f"{key}.json"
+        try:
+            with open(cache_file, 'r') as f:
+                results = json.load(f)
+            cache_file.touch()  # Mark as recently used for eviction
+            return results
+        except Exception:
+            # Missing or corrupted, treat as not cached
+            return None
+
+    def _write_disk(self, key: str, results: dict) -> None:
+        if self.disk_dir is None:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.disk_dir / f"{key}.json", 'w') as f:
+                json.dump(results, f)
+
+            cache_files = sorted(self.disk_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            total_bytes = sum(p.stat().st_size for p in cache_files)
+            for cache_file in cache_files:
+                if total_bytes <= self.max_disk_bytes:
+                    break
+                total_bytes -= cache_file.stat().st_size
+                cache_file.unlink()
+                with self._lock:
+                    self.evictions += 1
+        except OSError:
+            # The disk cache is best effort
+            pass
+
+
+simulation_cache = SimulationCache(disk_dir=SIMULATION_CACHE_DIR if SIMULATION_DISK_CACHE else None)
+
+
+def _index_dtype(dtype: type = np.float64) -> type:
+    """Integer type of the month-index matrices for a simulation in dtype."""
+    return np.int32 if np.dtype(dtype).itemsize < 8 else np.int64
+
+
+def _chunk_size_for_memory(num_months: int, max_memory_mb: float, dtype: type = np.float64) -> int:
+    """
+    Number of paths whose index matrix and sampling temporaries fit in
+    max_memory_mb (two index values per path-month, int32 for reduced
+    precision dtypes and int64 otherwise).
+    """
+    bytes_per_path = max(num_months, 1) * 2 * np.dtype(_index_dtype(dtype)).itemsize
+    return max(1, int(max_memory_mb * 1024 * 1024 // bytes_per_path))
+
+
+def _iter_simulated_chunks(
+    engine: str,
+    portfolio_returns: np.ndarray,
+    num_months: int,
+    num_paths: int,
+    W0: float,
+    C: float,
+    rng,
+    chunk_size: int,
+    sampler: str = 'random',
+    resampler: str = 'legacy'
+):
+    """Yield terminal wealths for successive chunks of at most chunk_size paths."""
+    n_months = len(portfolio_returns)
+    index_dtype = _index_dtype(portfolio_returns.dtype)
+
+    for chunk_start in range(0, num_paths, chunk_size):
+        chunk_paths = min(chunk_size, num_paths - chunk_start)
+        if engine == 'monthly':
+            if resampler == 'legacy':
+                block_indices = _sample_block_indices(
+                    n_months, num_months, chunk_paths, rng, sampler, portfolio_returns, index_dtype
+                )
+            else:
+                block_indices = RESAMPLERS[resampler](
+                    n_months, num_months, chunk_paths, rng, index_dtype=index_dtype
+                )
+            chunk_wealths = _simulate_terminal_wealths(portfolio_returns, block_indices, W0, C)
+        else:
+            chunk_wealths = _simulate_terminal_wealths_by_block(
+                portfolio_returns, num_months, chunk_paths, W0, C, rng, sampler
+            )
+        yield chunk_wealths
+
+
+def _simulate_adaptive(
+    engine: str,
+    portfolio_returns: np.ndarray,
+    num_months: int,
+    num_paths: int,
+    W0: float,
+    C: float,
+    rng,
+    chunk_size: int,
+    tolerance: float,
+    accumulator: WealthAccumulator,
+    sampler: str = 'random',
+    resampler: str = 'legacy'
+) -> None:
+    """
+    Feed paths into accumulator in deterministic increments until the
+    success-probability confidence interval is narrower than tolerance or
+    num_paths is reached.
+    """
+    while accumulator.count < num_paths:
+        increment_paths = min(ADAPTIVE_PATH_INCREMENT, num_paths - accumulator.count)
+        for chunk_wealths in _iter_simulated_chunks(
+            engine, portfolio_returns, num_months, increment_paths, W0, C, rng,
+            min(chunk_size, increment_paths), sampler, resampler
+        ):
+            accumulator.update(chunk_wealths)
+
+        if _success_ci_width(accumulator.successes, accumulator.count) <= tolerance:
+            break
+
+
+def _simulate_shard(
+    engine: str,
+    portfolio_returns: np.ndarray,
+    num_months: int,
+    num_paths: int,
+    W0: float,
+    C: float,
+    W_star: float,
+    seed_sequence: np.random.SeedSequence,
+    chunk_size: int,
+    keep_values: bool,
+    sampler: str = 'random',
+    resampler: str = 'legacy'
+) -> WealthAccumulator:
+    """Process-pool entry point: simulate one shard from its own seed sequence."""
+    rng = np.random.default_rng(seed_sequence)
+    accumulator = WealthAccumulator(W_star, keep_values=keep_values)
+    for chunk_wealths in _iter_simulated_chunks(
+        engine, portfolio_returns, num_months, num_paths, W0, C, rng, chunk_size, sampler, resampler
+    ):
+        accumulator.update(chunk_wealths)
+    return accumulator
+
+
+def _simulate_sharded(
+    engine: str,
+    portfolio_returns: np.ndarray,
+    num_months: int,
+    num_paths: int,
+    W0: float,
+    C: float,
+    W_star: float,
+    seed: int,
+    chunk_size: int,
+    workers: int,
+    keep_values: bool,
+    sampler: str = 'random',
+    resampler: str = 'legacy'
+) -> WealthAccumulator:
+    """
+    Split paths into fixed-size shards seeded from a SeedSequence spawn tree
+    and simulate them on a process pool. Shard accumulators are merged in
+    shard order, so the result does not depend on the number of workers.
+    """
+    shard_sizes = [
+        min(SIMULATION_SHARD_PATHS, num_paths - shard_start)
+        for shard_start in range(0, num_paths, SIMULATION_SHARD_PATHS)
+    ]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    shard_args = [
+        (engine, portfolio_returns, num_months, shard_paths, W0, C, W_star, seed_sequence, chunk_size,
+         keep_values, sampler, resampler)
+        for shard_paths, seed_sequence in zip(shard_sizes, seed_sequences)
+    ]
+
+    if workers == -1:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(shard_args))
+
+    if workers <= 1:
+        shards = [_simulate_shard(*args) for args in shard_args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(executor.map(_simulate_shard, *zip(*shard_args)))
+
+    accumulator = WealthAccumulator(W_star, keep_values=keep_values)
+    for shard in shards:
+        accumulator.merge(shard)
+    return accumulator
+
+
+def _draw_integers(rng, low: int, high: int, size: tuple, dtype: type = np.int64) -> np.ndarray:
+    """
+    Draw integers in [low, high) from a legacy RandomState or a Generator.
+    int32 and int64 draws consume the stream alike and give equal values.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.integers(low, high, size=size, dtype=dtype)
+    return rng.randint(low, high, size=size, dtype=dtype)
+
+
+def _draw_ranks(rng, num_ranks: int, size: tuple, sampler: str, dtype: type = np.int64) -> np.ndarray:
+    """
+    Draw ranks in [0, num_ranks) for the variance-reduced samplers.
+
+    'antithetic' pairs each path in the first half with a path of mirrored
+    rank in the second half; 'stratified' places exactly one path in each
+    of num_paths equal rank strata, independently for every column. Pairs
+    and strata span only the num_paths drawn here, i.e. one chunk.
+    """
+    num_paths = size[0]
+    if sampler == 'antithetic':
+        base = _draw_integers(rng, 0, num_ranks, ((num_paths + 1) // 2,) + size[1:], dtype)
+        return np.concatenate([base, num_ranks - 1 - base])[:num_paths]
+    if sampler == 'stratified':
+        strata = np.argsort(rng.random(size), axis=0)
+        return ((strata + rng.random(size)) / num_paths * num_ranks).astype(dtype)
+    raise ValueError(f"Unknown block sampler: {sampler}")
+
+
+def _sample_block_indices(
+    n_months: int,
+    num_months: int,
+    num_paths: int,
+    rng,
+    sampler: str = 'random',
+    portfolio_returns: Optional[np.ndarray] = None,
+    index_dtype: type = np.int64
+) -> np.ndarray:
+    """
+    Draw the (num_paths, num_months) matrix of indices, of type
+    index_dtype, into the portfolio return series for the block bootstrap.
+
+    All block starts are drawn in a single call in path-major order, which
+    consumes the RNG stream exactly like one draw per path and month.
+    The variance-reduced samplers draw return ranks instead and need
+    portfolio_returns to map each rank to its block start.
+    """
+    # If not enough history, use standard bootstrap (single-month blocks)
+    block_size = BLOCK_SIZE if n_months > BLOCK_SIZE else 1
+    num_starts = n_months - block_size + 1
+    offsets = np.arange(num_months, dtype=index_dtype) % block_size
+
+    if sampler == 'random':
+        return _draw_integers(rng, 0, num_starts, (num_paths, num_months), index_dtype) + offsets
+
+    # Starts sorted by the return they contribute at each in-block offset
+    start_order = np.array([
+        np.argsort(portfolio_returns[offset:offset + num_starts], kind='stable')
+        for offset in range(block_size)
+    ], dtype=index_dtype)
+    ranks = _draw_ranks(rng, num_starts, (num_paths, num_months), sampler, index_dtype)
+    return start_order[offsets, ranks] + offsets
+
+
+def _moving_block_indices(
+    n_months: int,
+    num_months: int,
+    num_paths: int,
+    rng,
+    block_size: int = BLOCK_SIZE,
+    index_dtype: type = np.int64
+) -> np.ndarray:
+    """
+    Moving-block bootstrap: each path is a concatenation of whole blocks of
+    block_size consecutive months, with one uniform start per block drawn
+    from the blocks that fit inside the history.
+    """
+    block_size = min(block_size, n_months)
+    num_blocks = -(-num_months // block_size)
+    starts = _draw_integers(rng, 0, n_months - block_size + 1, (num_paths, num_blocks), index_dtype)
+    return _expand_block_starts(starts, num_months, block_size)
+
+
+def _circular_block_indices(
+    n_months: int,
+    num_months: int,
+    num_paths: int,
+    rng,
+    block_size: int = BLOCK_SIZE,
+    index_dtype: type = np.int64
+) -> np.ndarray:
+    """
+    Circular-block bootstrap: like the moving-block scheme, but the history
+    is wrapped into a circle so every month can start a block and edge
+    months are sampled as often as the rest.
+    """
+    num_blocks = -(-num_months // block_size)
+    starts = _draw_integers(rng, 0, n_months, (num_paths, num_blocks), index_dtype)
+    return _expand_block_starts(starts, num_months, block_size) % n_months
+
+
+def _stationary_block_indices(
+    n_months: int,
+    num_months: int,
+    num_paths: int,
+    rng,
+    block_size: int = BLOCK_SIZE,
+    index_dtype: type = np.int64
+) -> np.ndarray:
+    """
+    Stationary bootstrap (Politis-Romano): block lengths are geometric with
+    mean block_size on the wrapped history. Every month a new block starts
+    with probability 1 / block_size at a uniform position; otherwise the
+    path continues with the next month.
+
+    One integer per path-month encodes both draws (u // block_size is the
+    start, u % block_size == 0 starts a new block), so the stream is
+    consumed path-major and chunking does not change the result.
+    """
+    draws = _draw_integers(rng, 0, n_months * block_size, (num_paths, num_months), index_dtype)
+    months = np.arange(num_months, dtype=index_dtype)
+    new_block = draws % block_size == 0
+    new_block[:, 0] = True
+    block_origin = np.maximum.accumulate(np.where(new_block, months, 0), axis=1)
+    starts = np.take_along_axis(draws // block_size, block_origin, axis=1)
+    return (starts + months - block_origin) % n_months
+
+
+# Month-index generators for the monthly engine, keyed by run_simulation's
+# resampler name. Each takes (n_months, num_months, num_paths, rng) and an
+# index_dtype keyword and returns a (num_paths, num_months) matrix of that
+# type indexing the history, so further schemes can be plugged in by adding
+# entries here.
+RESAMPLERS = {
+    'legacy': _sample_block_indices,
+    'moving_block': _moving_block_indices,
+    'circular': _circular_block_indices,
+    'stationary': _stationary_block_indices,
+}
+
+
+def _simulate_terminal_wealths(
+    portfolio_returns: np.ndarray,
+    block_indices: np.ndarray,
+    W0: float,
+    C: float
+) -> np.ndarray:
+    """
+    Apply the monthly wealth recurrence W <- W * (1 + r) + C to every path
+    at once and return the terminal wealth of each path.
+
+    portfolio_returns may be a (months x portfolios) matrix, in which case
+    every portfolio is advanced along the same sampled indices and the
+    result has shape (paths, portfolios).
+    """
+    growth = 1 + portfolio_returns
+    C = growth.dtype.type(C)
+    wealth = np.full(block_indices.shape[:1] + portfolio_returns.shape[1:], W0, dtype=growth.dtype)
+
+    for month in range(block_indices.shape[1]):
+        wealth = wealth * growth[block_indices[:, month]] + C
+
+    return wealth
+
+
+def _block_growth_tables(portfolio_returns: np.ndarray, block_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Precompute, for every possible block start s, the growth factor
+    prod(1 + r[s:s+block_size]) and the compounded value of a unit
+    contribution added at the end of each month of the block.
+
+    Advancing a path by one block is then W <- W * growth[s] + C * contrib[s].
+    """
+    num_starts = len(portfolio_returns) - block_size + 1
+    growth = np.ones(num_starts, dtype=portfolio_returns.dtype)
+    contrib = np.zeros(num_starts, dtype=portfolio_returns.dtype)
+
+    for offset in range(block_size):
+        monthly_growth = 1 + portfolio_returns[offset:offset + num_starts]
+        growth = growth * monthly_growth
+        contrib = contrib * monthly_growth + 1
+
+    return growth, contrib
+
+
+def _sample_block_starts(
+    n_months: int,
+    num_blocks: int,
+    num_paths: int,
+    block_size: int,
+    rng,
+    sampler: str = 'random',
+    block_growth: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Draw a (num_paths, num_blocks) matrix of whole-block start indices.
+    The variance-reduced samplers rank blocks by block_growth.
+    """
+    num_starts = n_months - block_size + 1
+    if sampler == 'random':
+        return _draw_integers(rng, 0, num_starts, (num_paths, num_blocks))
+
+    ranks = _draw_ranks(rng, num_starts, (num_paths, num_blocks), sampler)
+    return np.argsort(block_growth, kind='stable')[ranks]
+
+
+def _expand_block_starts(block_starts: np.ndarray, num_months: int, block_size: int) -> np.ndarray:
+    """Expand whole-block starts into the equivalent per-month index matrix."""
+    months = np.arange(num_months, dtype=block_starts.dtype)
+    return block_starts[:, months // block_size] + months % block_size
+
+
+def _simulate_terminal_wealths_by_block(
+    portfolio_returns: np.ndarray,
+    num_months: int,
+    num_paths: int,
+    W0: float,
+    C: float,
+    rng,
+    sampler: str = 'random'
+) -> np.ndarray:
+    """
+    Block-level wealth recurrence: sample whole blocks and advance every
+    path one block at a time, cutting the loop length by BLOCK_SIZE.
+
+    A trailing partial block (when num_months is not a multiple of the
+    block size) uses tables built for the shorter length.
+    """
+    n_months = len(portfolio_returns)
+    # If not enough history, fall back to single-month blocks (standard bootstrap)
+    block_size = BLOCK_SIZE if n_months > BLOCK_SIZE else 1
+
+    num_full_blocks, remainder = divmod(num_months, block_size)
+    num_blocks = num_full_blocks + (1 if remainder else 0)
+    growth, contrib = _block_growth_tables(portfolio_returns, block_size)
+    block_starts = _sample_block_starts(n_months, num_blocks, num_paths, block_size, rng, sampler, growth)
+
+    C = growth.dtype.type(C)
+    wealth = np.full(num_paths, W0, dtype=growth.dtype)
+
+    for block in range(num_full_blocks):
+        starts = block_starts[:, block]
+        wealth = wealth * growth[starts] + C * contrib[starts]
+
+    if remainder:
+        growth, contrib = _block_growth_tables(portfolio_returns, remainder)
+        starts = block_starts[:, -1]
+        wealth = wealth * growth[starts] + C * contrib[starts]
+
+    return wealth
+
+
+def estimate_success_analytic(
+    goal_params: dict,
+    portfolio: dict,
+    historical_returns: pd.DataFrame,
+    covariance: str = 'sample'
+) -> dict:
+    """
+    Moment-matched lognormal approximation of the simulation results.
+
+    Treats monthly portfolio returns as iid with the historical mean and
+    variance (the same moments compute_scores uses, or w' S w with S the
+    Ledoit-Wolf matrix from compute_covariance when covariance='ledoit_wolf'),
+    computes the exact mean and second moment of terminal wealth under the
+    contribution recurrence, and fits a lognormal to them. Runs in
+    microseconds, so it suits triage and sensitivity sweeps; it ignores the
+    serial correlation the block bootstrap preserves.
+
+    Returns dict with probability_of_success, median_wealth and
+    p10/p25/p75/p90_wealth, like run_simulation.
+    """
+
+    W0 = goal_params['starting_wealth']
+    W_star = goal_params['target_wealth']
+    C = goal_params['monthly_contribution']
+    num_months = goal_params['timeline_years'] * 12
+
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    returns = historical_returns[tickers]
+    portfolio_returns = returns.values @ weights
+
+    mean = portfolio_returns.mean()
+    if covariance == 'sample':
+        variance = portfolio_returns.var(ddof=1)
+    elif covariance == 'ledoit_wolf':
+        variance = float(weights @ compute_covariance(returns) @ weights)
+    else:
+        raise ValueError(f"Unknown covariance estimator: {covariance}")
+
+    # Exact E[W_k] and E[W_n^2] for W_{k+1} = W_k * (1 + r) + C with iid r
+    growth = 1 + mean
+    second_growth = growth ** 2 + variance
+    months = np.arange(num_months + 1)
+    powers = growth ** months
+    contributions = months.astype(float) if growth == 1 else (powers - 1) / (growth - 1)
+    first_moments = W0 * powers + C * contributions
+    first_moment = first_moments[-1]
+    second_moment = second_growth ** num_months * W0 ** 2 + np.sum(
+        second_growth ** (num_months - 1 - months[:-1]) * (2 * C * growth * first_moments[:-1] + C ** 2)
+    )
+
+    if first_moment <= 0:
+        # No wealth is ever accumulated
+        wealth_quantiles = {q: 0.0 for q in (0.1, 0.25, 0.5, 0.75, 0.9)}
+        probability = 100.0 if W_star <= 0 else 0.0
+    else:
+        sigma = np.sqrt(max(np.log(second_moment / first_moment ** 2), 0.0))
+        mu = np.log(first_moment) - sigma ** 2 / 2
+        standard_normal = NormalDist()
+        wealth_quantiles = {
+            q: float(np.exp(mu + sigma * standard_normal.inv_cdf(q))) for q in (0.1, 0.25, 0.5, 0.75, 0.9)
+        }
+        if W_star <= 0:
+            probability = 100.0
+        elif sigma == 0:
+            probability = 100.0 if first_moment >= W_star else 0.0
+        else:
+            probability = (1 - standard_normal.cdf((np.log(W_star) - mu) / sigma)) * 100
+
+    return {
+        'probability_of_success': float(probability),
+        'median_wealth': wealth_quantiles[0.5],
+        'p10_wealth': wealth_quantiles[0.1],
+        'p25_wealth': wealth_quantiles[0.25],
+        'p75_wealth': wealth_quantiles[0.75],
+        'p90_wealth': wealth_quantiles[0.9],
     }
 
 
@@ -370,6 +2338,182 @@ def compute_scores(
     }
 
 
+def compute_scores_batch(
+    simulation_results: list[dict],
+    tickers: list[str],
+    weights: np.ndarray,
+    goal_params: dict,
+    historical_returns: pd.DataFrame,
+    concerns: Optional[list[list[str]]] = None
+) -> list[dict]:
+    """
+    compute_scores for many portfolios over the same tickers at once.
+
+    weights is a (portfolios x tickers) matrix of fractional allocations and
+    simulation_results holds one summary per row (e.g. from
+    run_simulation_batch). Portfolio statistics come from one matrix
+    product and the score maps are evaluated as vectorized piecewise
+    functions; concern strings are only built for the rows that trigger
+    them. Zero-weight tickers do not count as holdings, matching a
+    portfolio that lists only its non-zero allocations.
+
+    Returns one compute_scores-style dict per row, in order.
+    """
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    num_portfolios = len(weights)
+    concerns = [list(c) for c in concerns] if concerns is not None else [[] for _ in range(num_portfolios)]
+
+    # Compute portfolio metrics
+    portfolio_returns = historical_returns[tickers].values @ weights.T
+    annual_return = (1 + portfolio_returns.mean(axis=0)) ** 12 - 1
+    annual_vol = portfolio_returns.std(axis=0, ddof=1) * np.sqrt(12)
+
+    # === DIVERSIFICATION SCORE ===
+    num_holdings = (weights > 0).sum(axis=1)
+    effective_n = 1 / (weights ** 2).sum(axis=1)
+    diversification_score = np.minimum(100, effective_n / num_holdings * 100)
+    max_weight = weights.max(axis=1)
+    concentrated = max_weight > 0.6
+    diversification_score = np.where(concentrated, diversification_score * 0.7, diversification_score)
+
+    # === RISK SCORE ===
+    vol_low, vol_high = VOLATILITY_BOUNDS
+    risk_score = np.select(
+        [annual_vol < vol_low, annual_vol < vol_high, annual_vol < EXTREME_VOL_THRESHOLD],
+        [100,
+         100 - 50 * (annual_vol - vol_low) / (vol_high - vol_low),
+         50 - 30 * (annual_vol - vol_high) / (EXTREME_VOL_THRESHOLD - vol_high)],
+        20
+    )
+
+    # === RETURN SCORE ===
+    return_low, return_high = STOCK_RETURN_BOUNDS
+    return_score = np.select(
+        [annual_return < return_low, annual_return < 0.08, annual_return < 0.12],
+        [np.maximum(20, annual_return / return_low * 40),
+         40 + 30 * (annual_return - return_low) / (0.08 - return_low),
+         70 + 30 * (annual_return - 0.08) / (0.12 - 0.08)],
+        100
+    )
+
+    # === PROBABILITY OF SUCCESS ===
+    probability = np.clip([r['probability_of_success'] for r in simulation_results], 0.5, 99.5)
+    goal_already_met = goal_params['starting_wealth'] >= goal_params['target_wealth']
+
+    # Concerns in the same order as compute_scores
+    checks = [
+        (concentrated, lambda i: f"Concentrated portfolio: {max_weight[i]*100:.0f}% in single ticker"),
+        (annual_vol >= EXTREME_VOL_THRESHOLD,
+         lambda i: f"Extreme volatility ({annual_vol[i]*100:.1f}% annual) - very high risk"),
+        (annual_return > return_high,
+         lambda i: f"Unusually high historical returns ({annual_return[i]*100:.1f}%) - may not persist"),
+        (probability < 5, lambda i: "Goal appears very difficult to achieve with this portfolio"),
+        ((probability > 95) & goal_already_met, lambda i: "Goal already achieved with starting wealth"),
+        (annual_return > return_high,
+         lambda i: f"Historical returns ({annual_return[i]*100:.1f}%) exceed typical stock market returns"),
+        (annual_vol > vol_high,
+         lambda i: f"Volatility ({annual_vol[i]*100:.1f}%) is higher than typical diversified portfolios"),
+    ]
+    for triggered, message in checks:
+        for i in np.flatnonzero(triggered):
+            concerns[i].append(message(i))
+
+    results = []
+    for i in range(num_portfolios):
+        reasoning = (
+            f"Portfolio Analysis:\n"
+            f"- Expected annual return: {annual_return[i]*100:.1f}%\n"
+            f"- Annual volatility: {annual_vol[i]*100:.1f}%\n"
+            f"- Diversification: {num_holdings[i]} tickers, effective N = {effective_n[i]:.1f}\n"
+            f"- Probability of achieving ${goal_params['target_wealth']:,.0f} in {goal_params['timeline_years']} years: {probability[i]:.1f}%\n"
+            f"\n"
+            f"The portfolio shows {_characterize_return(annual_return[i])} returns with "
+            f"{_characterize_volatility(annual_vol[i])} risk. "
+            f"Diversification is {_characterize_diversification(diversification_score[i])}."
+        )
+        results.append({
+            'probability_of_success': round(float(probability[i]), 1),
+            'diversification_score': round(float(diversification_score[i]), 1),
+            'risk_score': round(float(risk_score[i]), 1),
+            'return_score': round(float(return_score[i]), 1),
+            'reasoning': reasoning,
+            'concerns': concerns[i]
+        })
+
+    return results
+
+
+def verify_reduced_precision(dtype: type = np.float32, num_paths: int = NUM_SIMULATION_PATHS) -> list[str]:
+    """
+    Accuracy guardrail for reduced-precision simulation.
+
+    Runs a fixed reference set of goals and portfolios on deterministic
+    synthetic returns in float64 and in dtype, feeds both through
+    compute_scores and returns a description of every rounded score that
+    differs (an empty list means dtype is safe to use).
+    """
+    rng = np.random.RandomState(0)
+    historical_returns = pd.DataFrame({
+        'VTI': rng.normal(0.008, 0.045, 60),
+        'VXUS': rng.normal(0.005, 0.05, 60),
+        'BND': rng.normal(0.003, 0.012, 60),
+    })
+    goals = [
+        "Retire in 30 years with $1,000,000, investing $1,000/month",
+        "I have $20,000 and want to save $100,000 in 10 years, investing $500/month",
+        "I have $5,000 and want to save $80,000 in 15 years, investing $250/month",
+    ]
+    allocations = [(60, 20, 20), (90, 10, 0), (30, 0, 70), (100, 0, 0)]
+
+    mismatches = []
+    for goal in goals:
+        goal_params = parse_goal(goal)
+        for allocation in allocations:
+            portfolio = {'tickers': [
+                {'symbol': symbol, 'allocation_percent': percent}
+                for symbol, percent in zip(historical_returns.columns, allocation) if percent
+            ]}
+            scores = [
+                compute_scores(
+                    run_simulation(goal_params, portfolio, historical_returns, num_paths, dtype=precision),
+                    portfolio, goal_params, historical_returns, []
+                )
+                for precision in (np.float64, dtype)
+            ]
+            for key in ('probability_of_success', 'diversification_score', 'risk_score', 'return_score'):
+                if scores[0][key] != scores[1][key]:
+                    mismatches.append(
+                        f"{goal!r} {allocation}: {key} {scores[0][key]} (float64) vs {scores[1][key]}"
+                    )
+
+    return mismatches
+
+
+_reduced_precision_checks = {}  # dtype name -> mismatches found by verify_reduced_precision
+_reduced_precision_lock = threading.RLock()
+
+
+def _check_reduced_precision(dtype: type) -> None:
+    """
+    Run verify_reduced_precision() for dtype once per process and raise
+    ValueError if it changes any reference score.
+    """
+    name = np.dtype(dtype).name
+    with _reduced_precision_lock:
+        if name not in _reduced_precision_checks:
+            # The verification itself simulates in dtype; let those runs through
+            _reduced_precision_checks[name] = []
+            try:
+                _reduced_precision_checks[name] = verify_reduced_precision(dtype)
+            except BaseException:
+                del _reduced_precision_checks[name]
+                raise
+        mismatches = _reduced_precision_checks[name]
+    if mismatches:
+        raise ValueError(f"{name} simulation changes scores: {'; '.join(mismatches)}")
+
+
 def _characterize_return(annual_return: float) -> str:
     """Characterize return level"""
     if annual_return < 0.04:
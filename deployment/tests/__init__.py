@@ -1 +1,39 @@
 # Test package
+
+
+def synthetic_returns(tickers, n_months=60, seed=0):
+    """Deterministic monthly returns so simulation tests run without network access"""
+
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame(
+        rng.normal(0.006, 0.04, size=(n_months, len(tickers))),
+        columns=tickers
+    )
+
+
+def mixed_calendar_provider():
+    """
+    Market data provider whose tickers have different bar dates: A misses
+    a bar mid-history and C starts a year late, B is complete.
+    """
+
+    import numpy as np
+    import pandas as pd
+    from quant_eval import MarketDataProvider
+
+    class MixedCalendarProvider(MarketDataProvider):
+        name = "mixed_calendar"
+
+        def monthly_closes(self, tickers, years):
+            closes = pd.DataFrame(
+                {"A": np.linspace(100, 130, 24), "B": np.linspace(50, 60, 24), "C": np.linspace(10, 14, 24)},
+                index=pd.date_range("2022-01-01", periods=24, freq="MS")
+            )
+            closes.iloc[10, 0] = np.nan  # A has no bar in November 2022
+            closes.iloc[:12, 2] = np.nan  # C is listed in January 2023
+            return closes[tickers]
+
+    return MixedCalendarProvider()
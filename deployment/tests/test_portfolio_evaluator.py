@@ -0,0 +1,88 @@
+"""
+Evaluator Tests
+
+Tests PortfolioEvaluator helpers that run without a participant agent.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline, deterministic market data unless MARKET_DATA_PROVIDER=yahoo is set
+os.environ.setdefault("MARKET_DATA_PROVIDER", "synthetic")
+
+import pytest
+
+try:
+    from portfolio_evaluator import PortfolioEvaluator, build_sensitivity_table
+except ImportError as e:
+    pytest.skip(f"Evaluator dependencies not installed: {e}", allow_module_level=True)
+
+from quant_eval import download_yahoo_data, parse_goal, run_simulation, ReturnsCache
+
+from tests import mixed_calendar_provider, synthetic_returns
+
+
+def test_prefetched_returns_match_standalone_downloads():
+    """Union prefetch must give each scenario exactly the returns of downloading its own tickers"""
+
+    import quant_eval
+
+    provider = mixed_calendar_provider()
+    scenarios = [
+        ({}, "retirement", "Retire in 30 years with $1,000,000", {"tickers": [
+            {"symbol": "A", "allocation_percent": 60}, {"symbol": "B", "allocation_percent": 40}
+        ]}),
+        ({}, "house", "Save $100,000 in 5 years", {"tickers": [{"symbol": "B", "allocation_percent": 100}]}),
+        ({}, "college", "Save $80,000 in 15 years", {"tickers": [
+            {"symbol": "B", "allocation_percent": 50}, {"symbol": "C", "allocation_percent": 50}
+        ]}),
+    ]
+    evaluator = PortfolioEvaluator.__new__(PortfolioEvaluator)  # no API client needed for prefetch
+
+    previous = quant_eval.returns_cache
+    try:
+        quant_eval.returns_cache = ReturnsCache()
+        prefetched = evaluator.prefetch_scenario_returns(scenarios, provider)
+        assert quant_eval.returns_cache.stats()['misses'] == 1, "Prefetch should download the union once"
+
+        for idx, (_, goal_type, _, portfolio) in enumerate(scenarios):
+            tickers = [t['symbol'] for t in portfolio['tickers']]
+            quant_eval.returns_cache = ReturnsCache()
+            standalone = download_yahoo_data(tickers, years=5, provider=provider)
+            assert prefetched[idx].equals(standalone), f"Prefetched returns differ for {goal_type}"
+    finally:
+        quant_eval.returns_cache = previous
+
+    print(f"✓ Prefetched returns match standalone downloads for {len(scenarios)} scenarios")
+
+
+
+def test_sensitivity_goal_cell_shows_headline_probability():
+    """The sensitivity cell at the goal's own contribution and timeline must match the reported result"""
+
+    goal_params = parse_goal("I have $10,000 and want to save $160,000 in 20 years, investing $200/month")
+    portfolio = {"tickers": [
+        {"symbol": "VTI", "allocation_percent": 60}, {"symbol": "BND", "allocation_percent": 40}
+    ]}
+    data = synthetic_returns(["VTI", "BND"])
+    headline = run_simulation(goal_params, portfolio, data)['probability_of_success']
+
+    own_paths = build_sensitivity_table(goal_params, portfolio, data)
+    table = build_sensitivity_table(goal_params, portfolio, data, headline)
+
+    row = table["monthly_contributions"].index(200)
+    column = table["timeline_years"].index(20)
+    assert table["probability_of_success"][row][column] == round(headline, 1)
+    assert "note" in table and "note" not in own_paths
+
+    # Every other cell still comes from the table's own paths
+    own_paths["probability_of_success"][row][column] = round(headline, 1)
+    assert table["probability_of_success"] == own_paths["probability_of_success"]
+
+    print(f"✓ Sensitivity goal cell shows the headline {headline:.1f}%")
+
+
+if __name__ == "__main__":
+    test_prefetched_returns_match_standalone_downloads()
+    test_sensitivity_goal_cell_shows_headline_probability()
@@ -8,13 +8,58 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Offline, deterministic market data unless MARKET_DATA_PROVIDER=yahoo is set
+os.environ.setdefault("MARKET_DATA_PROVIDER", "synthetic")
+
 from quant_eval import (
     parse_goal,
     download_yahoo_data,
     compute_covariance,
-    validate_tickers_with_patterns
+    validate_tickers_with_patterns,
+    run_simulation,
+    run_simulation_batch,
+    run_simulation_horizons,
+    WealthAccumulator,
+    verify_reduced_precision,
+    SimulationCache,
+    estimate_success_analytic,
+    simulate_sensitivity,
+    solve_required_contribution,
+    run_simulation_assets,
+    replay_historical_windows,
+    compute_scores,
+    compute_scores_batch,
+    sweep_candidate_weights,
+    PriceStore,
+    ReturnsCache,
+    SingleFlight,
+    MarketDataProvider,
+    SnapshotProvider,
+    SyntheticProvider,
+    YahooProvider,
+    get_market_data_provider,
+    save_market_data_snapshot,
+    _sample_block_starts,
+    _expand_block_starts,
+    _simulate_terminal_wealths,
+    _simulate_terminal_wealths_by_block,
 )
 
+from tests import synthetic_returns, mixed_calendar_provider
+
+
+def _sample_goal_and_portfolio():
+    """Goal and two-fund portfolio shared by the simulation tests"""
+
+    goal_params = parse_goal("I have $10,000 and want to save $100,000 in 20 years, investing $200/month")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+    return goal_params, portfolio
+
 
 def test_parse_goal_basic():
     """Test basic goal parsing"""
@@ -110,6 +155,714 @@ def test_covariance_computation():
     print(f"✓ Covariance computation works")
 
 
+def test_block_recurrence_matches_monthly_recurrence():
+    """Block-level recurrence must match the monthly recurrence on the same blocks"""
+
+    import numpy as np
+
+    returns = synthetic_returns(["A"])["A"].values
+    num_months, num_paths = 63, 500  # includes a trailing partial block
+
+    by_block = _simulate_terminal_wealths_by_block(
+        returns, num_months, num_paths, 1000.0, 50.0, np.random.RandomState(7)
+    )
+
+    starts = _sample_block_starts(len(returns), 11, num_paths, 6, np.random.RandomState(7))
+    monthly = _simulate_terminal_wealths(returns, _expand_block_starts(starts, num_months, 6), 1000.0, 50.0)
+
+    assert np.allclose(by_block, monthly, rtol=1e-12, atol=0), "Block and monthly recurrences disagree"
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    result = run_simulation(goal_params, portfolio, data, num_paths=500, engine='block')
+    assert 0 <= result['probability_of_success'] <= 100
+
+    print("✓ Block recurrence matches monthly recurrence")
+
+
+def test_batch_simulation_uses_common_random_numbers():
+    """Batch simulation must match per-portfolio runs that share the same stream"""
+
+    import numpy as np
+
+    goal_params, _ = _sample_goal_and_portfolio()
+    tickers = ["VTI", "BND", "VXUS"]
+    data = synthetic_returns(tickers)
+    weights = np.array([
+        [0.6, 0.4, 0.0],
+        [0.2, 0.5, 0.3],
+        [1.0, 0.0, 0.0],
+    ])
+
+    batch = run_simulation_batch(goal_params, tickers, weights, data, num_paths=400, rng=np.random.default_rng(3))
+    assert len(batch) == 3
+
+    for row, result in zip(weights, batch):
+        portfolio = {"tickers": [
+            {"symbol": s, "allocation_percent": w * 100} for s, w in zip(tickers, row)
+        ]}
+        single = run_simulation(
+            goal_params, portfolio, data, num_paths=400, rng=np.random.default_rng(3), return_terminal_wealths=True
+        )
+        assert np.allclose(result['terminal_wealths'], single['terminal_wealths'], rtol=1e-10), \
+            f"Batch result for weights {row} differs from single run"
+
+    print(f"✓ Batch simulation: {[round(r['probability_of_success'], 1) for r in batch]}")
+
+
+def test_horizon_simulation_reuses_path_prefixes():
+    """Each horizon must match a single run over the prefix of the shared paths"""
+
+    import numpy as np
+
+    _, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    goals = [
+        parse_goal("Retire in 30 years with $1,000,000, investing $1,500/month"),
+        parse_goal("I have $20,000 and want to save $100,000 in 10 years, investing $500/month"),
+        parse_goal("I have $5,000 and want to save $80,000 in 15 years, investing $300/month"),
+    ]
+
+    shared = run_simulation_horizons(goals, portfolio, data, num_paths=300, rng=np.random.default_rng(11))
+
+    # Rebuild the longest-horizon index matrix and check each goal on its prefix
+    paths_rng = np.random.default_rng(11)
+    n_months = len(data)
+    starts = paths_rng.integers(0, n_months - 6 + 1, size=(300, 360))
+    indices = starts + np.arange(360) % 6
+    portfolio_returns = (data[["VTI", "BND"]] * np.array([0.6, 0.4])).sum(axis=1).values
+
+    for goal, result in zip(goals, shared):
+        expected = _simulate_terminal_wealths(
+            portfolio_returns, indices[:, :goal['timeline_years'] * 12],
+            goal['starting_wealth'], goal['monthly_contribution']
+        )
+        assert np.array_equal(result['terminal_wealths'], expected), \
+            f"Horizon {goal['timeline_years']}y does not match its path prefix"
+
+    print(f"✓ Horizon prefix reuse: {[round(r['probability_of_success'], 1) for r in shared]}")
+
+
+def test_variance_reduced_samplers_preserve_distribution():
+    """Antithetic and stratified samplers must agree with random sampling on large runs"""
+
+    goal_params = parse_goal("I have $10,000 and want to save $160,000 in 20 years, investing $200/month")
+    _, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+
+    for engine in ("monthly", "block"):
+        reference = run_simulation(goal_params, portfolio, data, num_paths=20000, engine=engine)
+        for sampler in ("antithetic", "stratified"):
+            result = run_simulation(goal_params, portfolio, data, num_paths=20000, engine=engine, sampler=sampler)
+            gap = abs(result['probability_of_success'] - reference['probability_of_success'])
+            assert gap < 2.0, f"{sampler} sampler ({engine}) is off by {gap:.2f}pp"
+
+    print("✓ Variance-reduced samplers preserve the bootstrap distribution")
+
+
+def test_wealth_accumulator_streams_and_merges():
+    """Streamed percentiles must be within sketch accuracy and merge like a single pass"""
+
+    import numpy as np
+
+    wealths = np.random.RandomState(5).lognormal(11, 0.6, 50000)
+
+    single = WealthAccumulator(100000)
+    single.update(wealths)
+
+    merged = WealthAccumulator(100000)
+    for chunk in np.array_split(wealths, 7):
+        part = WealthAccumulator(100000)
+        part.update(chunk)
+        merged.merge(part)
+
+    assert merged.summary() == single.summary(), "Merged accumulators differ from a single pass"
+    assert single.successes == (wealths >= 100000).sum()
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        exact = np.percentile(wealths, q * 100)
+        assert abs(single.quantile(q) - exact) / exact < 0.006, f"Quantile {q} outside sketch accuracy"
+
+    # The full array is only returned on request
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    streamed = run_simulation(goal_params, portfolio, data, num_paths=1000)
+    exact = run_simulation(goal_params, portfolio, data, num_paths=1000, return_terminal_wealths=True)
+    assert 'terminal_wealths' not in streamed
+    assert streamed['probability_of_success'] == exact['probability_of_success']
+
+    print(f"✓ Wealth accumulator: median {single.quantile(0.5):,.0f}")
+
+
+def test_float32_simulation_matches_float64_scores():
+    """Reduced-precision simulation must leave every rounded score unchanged"""
+
+    import numpy as np
+    import quant_eval
+    from quant_eval import _chunk_size_for_memory, _sample_block_indices
+
+    mismatches = verify_reduced_precision()
+    assert mismatches == [], f"float32 changes scores: {mismatches}"
+
+    # int32 indices follow the same stream and let chunks hold twice the paths
+    indices = _sample_block_indices(60, 240, 500, np.random.RandomState(3), index_dtype=np.int32)
+    assert indices.dtype == np.int32
+    assert np.array_equal(indices, _sample_block_indices(60, 240, 500, np.random.RandomState(3)))
+    assert _chunk_size_for_memory(240, 64, np.float32) == 2 * _chunk_size_for_memory(240, 64)
+
+    # The first reduced-precision run verifies the dtype, and a dtype that changes scores is refused
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    run_simulation(goal_params, portfolio, data, num_paths=500, dtype=np.float32)
+    assert quant_eval._reduced_precision_checks['float32'] == []
+    quant_eval._reduced_precision_checks['float16'] = ["reference score changed"]
+    try:
+        run_simulation(goal_params, portfolio, data, num_paths=500, dtype=np.float16)
+        assert False, "float16 should be refused"
+    except ValueError:
+        pass
+    finally:
+        del quant_eval._reduced_precision_checks['float16']
+
+    print("✓ float32 simulation matches float64 scores on the reference set")
+
+
+def test_simulation_cache_memoizes_summaries():
+    """Identical simulations must be served from the cache, changed data must miss"""
+
+    import tempfile
+    import quant_eval
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        previous_cache = quant_eval.simulation_cache
+        quant_eval.simulation_cache = SimulationCache(max_entries=2, disk_dir=cache_dir)
+        try:
+            first = run_simulation(goal_params, portfolio, data, num_paths=500)
+            second = run_simulation(goal_params, portfolio, data, num_paths=500)
+            run_simulation(goal_params, portfolio, synthetic_returns(["VTI", "BND"], seed=1), num_paths=500)
+            assert first == second
+            assert quant_eval.simulation_cache.stats()['hits'] == 1
+            assert quant_eval.simulation_cache.stats()['misses'] == 2
+
+            # A fresh process would still find the summary on disk
+            quant_eval.simulation_cache = SimulationCache(max_entries=2, disk_dir=cache_dir)
+            assert run_simulation(goal_params, portfolio, data, num_paths=500) == first
+            assert quant_eval.simulation_cache.stats()['disk_hits'] == 1
+
+            # Size-based eviction on both levels
+            tiny = SimulationCache(max_entries=1, disk_dir=cache_dir, max_disk_mb=0)
+            tiny.put("a", {"probability_of_success": 1.0})
+            tiny.put("b", {"probability_of_success": 2.0})
+            assert tiny.get("a") is None and tiny.stats()['evictions'] >= 2
+        finally:
+            quant_eval.simulation_cache = previous_cache
+
+    print("✓ Simulation cache memoizes summaries")
+
+
+def test_analytic_estimate_tracks_bootstrap():
+    """The closed-form estimate must be close to the bootstrap on a long history"""
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"], n_months=600)
+
+    analytic = estimate_success_analytic(goal_params, portfolio, data)
+    simulated = run_simulation(goal_params, portfolio, data, num_paths=20000)
+
+    gap = abs(analytic['probability_of_success'] - simulated['probability_of_success'])
+    assert gap < 4.0, f"Analytic estimate off by {gap:.1f}pp"
+    assert abs(analytic['median_wealth'] / simulated['median_wealth'] - 1) < 0.05
+    assert analytic['p10_wealth'] < analytic['median_wealth'] < analytic['p90_wealth']
+
+    shrunk = estimate_success_analytic(goal_params, portfolio, data, covariance='ledoit_wolf')
+    assert 0 <= shrunk['probability_of_success'] <= 100
+
+    print(f"✓ Analytic estimate {analytic['probability_of_success']:.1f}% "
+          f"vs bootstrap {simulated['probability_of_success']:.1f}%")
+
+
+def test_sensitivity_surface_matches_individual_runs():
+    """Every grid point must match a simulation of that goal on the same paths"""
+
+    import numpy as np
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    contributions = [0, 200, 500]
+    timelines = [10, 20]
+
+    surface = simulate_sensitivity(
+        goal_params, portfolio, data, contributions, timelines, num_paths=400, rng=np.random.default_rng(4)
+    )
+    assert surface['probability_of_success'].shape == (3, 2)
+
+    grid_goals = [
+        dict(goal_params, monthly_contribution=c, timeline_years=t)
+        for c in contributions for t in timelines
+    ]
+    expected = run_simulation_horizons(grid_goals, portfolio, data, num_paths=400, rng=np.random.default_rng(4))
+    expected = np.array([r['probability_of_success'] for r in expected]).reshape(3, 2)
+
+    assert np.allclose(surface['probability_of_success'], expected), \
+        f"Sensitivity surface {surface['probability_of_success']} differs from {expected}"
+
+    print(f"✓ Sensitivity surface: {surface['probability_of_success'].round(1).tolist()}")
+
+
+def test_required_contribution_solver():
+    """The solved contribution must be the smallest one reaching the target probability"""
+
+    import numpy as np
+
+    goal_params = parse_goal("I have $10,000 and want to save $160,000 in 20 years, investing $200/month")
+    _, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+
+    # 7% of 3000 paths is exactly 210, which a floating-point count used to round up to 211
+    for solve_for, target, num_paths in (
+        ("monthly_contribution", 90.0, 1000), ("starting_wealth", 90.0, 1000), ("monthly_contribution", 7.0, 3000)
+    ):
+        solution = solve_required_contribution(
+            goal_params, portfolio, data, target_probability=target, solve_for=solve_for,
+            num_paths=num_paths, rng=np.random.default_rng(8)
+        )
+        required = solution['required_value']
+        assert solution['achieved_probability'] >= target
+
+        # Check against full simulations on the same paths, one cent below and at the answer
+        below, at = run_simulation_horizons(
+            [dict(goal_params, **{solve_for: value}) for value in (required - 0.01, required)],
+            portfolio, data, num_paths=num_paths, rng=np.random.default_rng(8)
+        )
+        assert below['probability_of_success'] < target <= at['probability_of_success'], \
+            f"{solve_for} = {required} is not the minimum for {target}% success"
+
+    # A zero timeline already met needs no contribution; an out-of-range target is rejected
+    funded = dict(goal_params, starting_wealth=200000, timeline_years=0)
+    solution = solve_required_contribution(funded, portfolio, data, num_paths=1000)
+    assert solution['required_value'] == 0.0 and solution['achieved_probability'] == 100.0
+    solution = solve_required_contribution(funded, portfolio, data, num_paths=1000, solve_for="starting_wealth")
+    assert solution['required_value'] == 160000.0 and solution['achieved_probability'] == 100.0
+    try:
+        solve_required_contribution(goal_params, portfolio, data, target_probability=101.0, num_paths=1000)
+        assert False, "target_probability above 100 should be rejected"
+    except ValueError:
+        pass
+
+    print(f"✓ Required contribution solver: ${required:,.2f} monthly for 7%")
+
+
+def test_asset_level_engine():
+    """Asset-level engine must match the single-series engine and model drift"""
+
+    import numpy as np
+    from quant_eval import _sample_block_indices
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+
+    # Monthly rebalancing to fixed weights is the single-series recurrence
+    single = run_simulation(goal_params, portfolio, data, num_paths=500,
+                            rng=np.random.default_rng(4), return_terminal_wealths=True)
+    assets = run_simulation_assets(goal_params, portfolio, data, num_paths=500,
+                                   rng=np.random.default_rng(4), return_terminal_wealths=True)
+    assert np.allclose(single['terminal_wealths'], assets['terminal_wealths'], rtol=1e-10)
+
+    # Without rebalancing or contributions each asset compounds on its own
+    no_contribution = dict(goal_params, monthly_contribution=0)
+    drift = run_simulation_assets(no_contribution, portfolio, data, num_paths=500, rebalance='never',
+                                  rng=np.random.default_rng(4), return_terminal_wealths=True)
+    block_indices = _sample_block_indices(len(data), goal_params['timeline_years'] * 12, 500,
+                                          np.random.default_rng(4))
+    buy_and_hold = sum(
+        goal_params['starting_wealth'] * t['allocation_percent'] / 100
+        * np.prod(1 + data[t['symbol']].values[block_indices], axis=1)
+        for t in portfolio['tickers']
+    )
+    assert np.allclose(drift['terminal_wealths'], buy_and_hold, rtol=1e-10)
+
+    # A glide path into bonds changes the outcome of the fixed mix
+    glide_path = {"tickers": [{"symbol": "VTI", "allocation_percent": 20},
+                              {"symbol": "BND", "allocation_percent": 80}]}
+    glided = run_simulation_assets(goal_params, portfolio, data, num_paths=500, rebalance='annual',
+                                   glide_path=glide_path, rng=np.random.default_rng(4))
+    assert glided['median_wealth'] != assets['median_wealth']
+
+    print(f"✓ Asset-level engine: glide path median ${glided['median_wealth']:,.0f} "
+          f"vs ${assets['median_wealth']:,.0f} fixed")
+
+
+def test_resampler_family():
+    """Every resampler must yield valid, chunk-independent index matrices"""
+
+    import numpy as np
+    from quant_eval import BLOCK_SIZE, RESAMPLERS
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+
+    # The default is the original scheme
+    assert run_simulation(goal_params, portfolio, data, num_paths=300, use_cache=False) == \
+        run_simulation(goal_params, portfolio, data, num_paths=300, use_cache=False, resampler='legacy')
+
+    for name, resample in RESAMPLERS.items():
+        indices = resample(60, 240, 400, np.random.default_rng(6))
+        assert indices.shape == (400, 240) and indices.min() >= 0 and indices.max() < 60, name
+
+        whole = run_simulation(goal_params, portfolio, data, num_paths=400, resampler=name,
+                               rng=np.random.default_rng(6), return_terminal_wealths=True)
+        chunked = run_simulation(goal_params, portfolio, data, num_paths=400, resampler=name, chunk_size=70,
+                                 rng=np.random.default_rng(6), return_terminal_wealths=True)
+        assert np.array_equal(whole['terminal_wealths'], chunked['terminal_wealths']), name
+
+    # Circular blocks wrap around the end of the history
+    circular = RESAMPLERS['circular'](60, 240, 400, np.random.default_rng(6))
+    assert ((circular[:, 1:] - circular[:, :-1]) == -59).any()
+
+    # Stationary blocks have geometric lengths with mean BLOCK_SIZE
+    stationary = RESAMPLERS['stationary'](60, 240, 2000, np.random.default_rng(6))
+    continued = (stationary[:, 1:] - stationary[:, :-1]) % 60 == 1
+    assert abs(1 / (1 - continued.mean()) - BLOCK_SIZE) < 0.3
+
+    print(f"✓ Resampler family: {', '.join(RESAMPLERS)}")
+
+
+def test_historical_window_replay():
+    """Window replay must match a direct month-by-month walk over each window"""
+
+    import numpy as np
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    data = synthetic_returns(["VTI", "BND"])
+    portfolio_returns = (data[["VTI", "BND"]] * [0.6, 0.4]).sum(axis=1).values
+
+    def replay(start, num_months):
+        wealth = goal_params['starting_wealth']
+        for month in range(num_months):
+            wealth = wealth * (1 + portfolio_returns[(start + month) % len(portfolio_returns)]) \
+                + goal_params['monthly_contribution']
+        return wealth
+
+    for years in (3, 20):
+        goal = dict(goal_params, timeline_years=years)
+        replayed = replay_historical_windows(goal, portfolio, data)
+        expected = np.array([
+            replay(start, years * 12)
+            for start in range(len(data) - years * 12 + 1 if years * 12 <= len(data) else len(data))
+        ])
+
+        assert replayed['num_windows'] == len(expected)
+        assert replayed['wrapped'] == (years * 12 > len(data))
+        assert np.isclose(replayed['worst_window']['terminal_wealth'], expected.min())
+        assert np.isclose(replayed['probability_of_success'],
+                          (expected >= goal['target_wealth']).mean() * 100)
+
+    print(f"✓ Historical window replay: worst window ${replayed['worst_window']['terminal_wealth']:,.0f}")
+
+
+def test_compute_scores_batch_matches_single():
+    """Batch scoring must reproduce compute_scores row by row, concerns included"""
+
+    import itertools
+    import numpy as np
+
+    goal_params, _ = _sample_goal_and_portfolio()
+    tickers = ["VTI", "BND", "TQQQ"]
+    data = synthetic_returns(tickers, seed=2)
+    data["BND"] = data["BND"] / 4
+    data["TQQQ"] = data["TQQQ"] * 4 + 0.02  # volatile, high-return ticker to trigger concerns
+
+    weights = np.array([
+        allocation for allocation in itertools.product(range(0, 101, 10), repeat=3)
+        if sum(allocation) == 100
+    ]) / 100
+    simulations = run_simulation_batch(goal_params, tickers, weights, data, num_paths=200)
+
+    batch = compute_scores_batch(simulations, tickers, weights, goal_params, data)
+    assert len(batch) == len(weights)
+
+    for row, simulation, scores in zip(weights, simulations, batch):
+        portfolio = {"tickers": [
+            {"symbol": symbol, "allocation_percent": round(weight * 100)}
+            for symbol, weight in zip(tickers, row) if weight > 0
+        ]}
+        single = compute_scores(simulation, portfolio, goal_params, data, [])
+        for key in ("probability_of_success", "diversification_score", "risk_score", "return_score"):
+            assert abs(single[key] - scores[key]) <= 0.1, f"{key} differs for {row}: {single[key]} vs {scores[key]}"
+        assert single['concerns'] == scores['concerns'], f"Concerns differ for {row}"
+
+    flagged = sum(bool(scores['concerns']) for scores in batch)
+    print(f"✓ Batch scoring: {len(batch)} portfolios, {flagged} with concerns")
+
+
+def test_candidate_weight_sweep():
+    """The sweep must cover the weight grid and score candidates on shared paths"""
+
+    import numpy as np
+
+    goal_params, portfolio = _sample_goal_and_portfolio()
+    goal_params = dict(goal_params, target_wealth=150000)
+    data = synthetic_returns(["VTI", "BND"])
+    data["BND"] = data["BND"] / 4
+
+    sweep = sweep_candidate_weights(goal_params, portfolio, data, grid_step=10, num_paths=500)
+    assert sweep['num_candidates'] == 11
+    assert sweep['regret'] >= 0
+    assert sweep['regret'] == sweep['best_probability'] - sweep['portfolio_probability']
+
+    # Each candidate equals a batch run of that weighting on the same stream
+    grid = np.array([[w, 1 - w] for w in np.linspace(0, 1, 11)])
+    batch = run_simulation_batch(goal_params, ["VTI", "BND"], np.vstack([[0.6, 0.4], grid]), data, num_paths=500)
+    assert sweep['portfolio_probability'] == batch[0]['probability_of_success']
+    assert sweep['best_probability'] == max(result['probability_of_success'] for result in batch[1:])
+
+    print(f"✓ Candidate sweep: best {sweep['best_probability']:.1f}% at {sweep['best_weights']}, "
+          f"regret {sweep['regret']:.1f}pp")
+
+
+def test_price_store_fetches_only_missing_months():
+    """The price store must fetch deltas only and serve a warm store offline"""
+
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from datetime import datetime
+
+    history = pd.DataFrame(
+        {"VTI": np.linspace(100, 200, 120), "BND": np.linspace(80, 90, 120)},
+        index=pd.date_range("2015-01-01", periods=120, freq="MS")
+    )
+    fetches = []
+
+    def fetch(tickers, start_date, end_date):
+        fetches.append((tuple(tickers), start_date, end_date))
+        return history.loc[(history.index >= start_date) & (history.index <= end_date), tickers]
+
+    def offline(tickers, start_date, end_date):
+        raise ConnectionError("no network")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = PriceStore(store_dir)
+        prices = store.get_prices(["VTI", "BND"], datetime(2018, 1, 15), datetime(2020, 6, 15), fetch)
+        assert len(fetches) == 1 and list(prices.columns) == ["VTI", "BND"]
+        assert prices.equals(history.loc["2018-02-01":"2020-06-01"])
+
+        # Same day: served from disk, even by a new process
+        assert PriceStore(store_dir).get_prices(["BND"], datetime(2018, 1, 15), datetime(2020, 6, 15), fetch) \
+            .equals(history.loc["2018-02-01":"2020-06-01", ["BND"]])
+        assert len(fetches) == 1
+
+        # Later: only the months since the last stored bar are fetched
+        prices = store.get_prices(["VTI", "BND"], datetime(2018, 1, 15), datetime(2020, 9, 15), fetch)
+        assert fetches[-1] == (("VTI", "BND"), datetime(2020, 6, 1), datetime(2020, 9, 15))
+        assert prices.equals(history.loc["2018-02-01":"2020-09-01"])
+
+        # Warm store keeps working when the fetch fails
+        prices = store.get_prices(["VTI", "BND"], datetime(2018, 1, 15), datetime(2020, 12, 15), offline)
+        assert prices.equals(history.loc["2018-02-01":"2020-09-01"])
+        assert store.stats()['fetch_errors'] == 1
+
+    print(f"✓ Price store: {len(fetches)} fetches, delta refresh and offline reads")
+
+
+def test_returns_cache_serves_subsets():
+    """Downloads must be reused in-process, subsets included, with TTL and size bounds"""
+
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from datetime import datetime, timedelta
+    import quant_eval
+
+    history = pd.DataFrame(
+        {"VTI": np.linspace(100, 200, 80), "BND": np.linspace(80, 90, 80), "NEW": np.nan},
+        index=pd.date_range(end=datetime.now(), periods=80, freq="MS")
+    )
+    history.iloc[-20:, 2] = np.linspace(10, 12, 20)  # short history must not shorten the others
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        previous = quant_eval.price_store, quant_eval.returns_cache
+        quant_eval.price_store = PriceStore(store_dir)
+        quant_eval.returns_cache = ReturnsCache()
+        try:
+            # Warm the store so download_yahoo_data needs no network
+            quant_eval.price_store.get_prices(
+                list(history.columns), datetime.now() - timedelta(days=3650), datetime.now(),
+                lambda tickers, start_date, end_date: history[tickers]
+            )
+            superset = download_yahoo_data(["VTI", "BND", "NEW"], provider=YahooProvider())
+            subset = download_yahoo_data(["BND", "VTI"], provider=YahooProvider())
+            stats = quant_eval.returns_cache.stats()
+            assert stats['misses'] == 1 and stats['subset_hits'] == 1
+            assert len(superset) == 19 and len(subset) > 50
+            assert list(subset.columns) == ["BND", "VTI"]
+
+            quant_eval.returns_cache = ReturnsCache()
+            assert subset.equals(download_yahoo_data(["BND", "VTI"], provider=YahooProvider()))
+        finally:
+            quant_eval.price_store, quant_eval.returns_cache = previous
+
+    # Expiry and byte-bounded eviction
+    expiring = ReturnsCache(ttl_seconds=0)
+    expiring.put(["VTI"], 5, "2024-01", history[["VTI"]])
+    assert expiring.get(["VTI"], 5, "2024-01") is None and expiring.stats()['expirations'] == 1
+
+    small = ReturnsCache(max_mb=1.5 * history.memory_usage(deep=True).sum() / 1024 / 1024)
+    small.put(list(history.columns), 5, "2024-01", history)
+    small.put(list(history.columns), 5, "2024-02", history)
+    assert small.stats()['evictions'] == 1 and small.get(["VTI"], 5, "2024-01") is None
+
+    print(f"✓ Returns cache: subset served from superset, {stats}")
+
+
+def test_returns_cache_subset_with_calendar_gap():
+    """A ticker missing a bar mid-history must not cost a subset extra rows when served from a superset"""
+
+    import quant_eval
+
+    provider = mixed_calendar_provider()
+    previous = quant_eval.returns_cache
+    try:
+        quant_eval.returns_cache = ReturnsCache()
+        standalone = {tickers: download_yahoo_data(list(tickers), provider=provider) for tickers in ("A", "B")}
+
+        quant_eval.returns_cache = ReturnsCache()
+        download_yahoo_data(["A", "B"], provider=provider)
+        for tickers, expected in standalone.items():
+            served = download_yahoo_data(list(tickers), provider=provider)
+            assert served.equals(expected), f"Subset {tickers} differs from a standalone download"
+        assert quant_eval.returns_cache.stats()['subset_hits'] == 2
+        assert len(standalone["B"]) == 23 and len(standalone["A"]) == 22
+    finally:
+        quant_eval.returns_cache = previous
+
+    print("✓ Returns cache: subsets keep their own bar dates")
+
+
+def test_single_flight_coalesces_concurrent_fetches():
+    """Concurrent requests for overlapping tickers must share in-flight fetches"""
+
+    import threading
+    import time
+    import pandas as pd
+
+    flights = SingleFlight()
+    requested = []
+    release = threading.Event()
+
+    def fetch(tickers):
+        requested.append(sorted(tickers))
+        release.wait(timeout=10)
+        return pd.DataFrame({ticker: [1.0, 2.0] for ticker in tickers})
+
+    ticker_sets = [["VTI", "BND"], ["BND", "VTI"], ["VTI", "BND", "VXUS"], ["BND"]]
+    results = [None] * len(ticker_sets)
+
+    def request(i):
+        results[i] = flights.fetch(ticker_sets[i], ("2020-01-01", "2025-01-01"), fetch)
+
+    leader = threading.Thread(target=request, args=(0,))
+    leader.start()
+    while flights.stats()['in_flight'] < 2:
+        time.sleep(0.001)
+    followers = [threading.Thread(target=request, args=(i,)) for i in range(1, len(ticker_sets))]
+    for follower in followers:
+        follower.start()
+    while flights.stats()['coalesced'] < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    # Only VXUS needed a second upstream request
+    assert requested == [["BND", "VTI"], ["VXUS"]]
+    assert all(list(result.columns) == tickers for result, tickers in zip(results, ticker_sets))
+    assert flights.stats() == {'in_flight': 0, 'fetches': 2, 'coalesced': 5}
+
+    # Failures reach every waiter and are not remembered
+    def failing(tickers):
+        raise ConnectionError("rate limited")
+    try:
+        flights.fetch(["VTI"], ("2020-01-01", "2025-01-01"), failing)
+        assert False, "Expected the fetch error"
+    except ConnectionError:
+        pass
+    assert flights.stats()['in_flight'] == 0
+
+    # An interrupt of the leader (a BaseException) must still release the waiters
+    class Interrupted(BaseException):
+        pass
+
+    release.clear()
+    errors = []
+
+    def interrupted(tickers):
+        release.wait(timeout=10)
+        raise Interrupted()
+
+    def interrupted_request(_):
+        try:
+            flights.fetch(["VTI"], ("2020-01-01", "2025-01-01"), interrupted)
+        except Interrupted as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=interrupted_request, args=(0,))
+    leader.start()
+    while flights.stats()['in_flight'] < 1:
+        time.sleep(0.001)
+    follower = threading.Thread(target=interrupted_request, args=(1,))
+    follower.start()
+    while flights.stats()['coalesced'] < 6:
+        time.sleep(0.001)
+    release.set()
+    for thread in (leader, follower):
+        thread.join(timeout=10)
+        assert not thread.is_alive(), "A waiter hung after the leader was interrupted"
+    assert len(errors) == 2 and flights.stats()['in_flight'] == 0
+
+    print(f"✓ Single-flight downloads: {len(ticker_sets)} requests, {len(requested)} upstream fetches")
+
+
+def test_market_data_providers():
+    """Snapshot and synthetic providers must give deterministic offline data"""
+
+    import tempfile
+
+    assert isinstance(get_market_data_provider("synthetic"), SyntheticProvider)
+    synthetic = download_yahoo_data(["VTI", "BND"], years=5, provider=SyntheticProvider())
+    assert synthetic.equals(download_yahoo_data(["VTI", "BND"], years=5, provider=SyntheticProvider()))
+    assert len(synthetic) == 59 and list(synthetic.columns) == ["VTI", "BND"]
+
+    # A snapshot replays exactly what was captured
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        save_market_data_snapshot(["VTI", "BND"], snapshot_dir, years=5, provider=SyntheticProvider())
+        replayed = download_yahoo_data(["BND", "VTI"], years=5, provider=SnapshotProvider(snapshot_dir))
+        assert (replayed - synthetic[["BND", "VTI"]]).abs().max().max() < 1e-12
+
+        try:
+            download_yahoo_data(["VXUS"], years=5, provider=SnapshotProvider(snapshot_dir))
+            assert False, "Expected missing snapshot data to raise"
+        except ValueError:
+            pass
+
+    try:
+        get_market_data_provider("bloomberg")
+        assert False, "Expected unknown provider to raise"
+    except ValueError:
+        pass
+
+    # The base class only declares the interface
+    try:
+        MarketDataProvider()
+        assert False, "Expected the abstract provider to refuse instantiation"
+    except TypeError:
+        pass
+
+    print(f"✓ Market data providers: {len(synthetic)} synthetic months, snapshot replay")
+
+
 if __name__ == "__main__":
     print("Running unit tests...")
     print()
@@ -120,6 +873,26 @@ if __name__ == "__main__":
     test_download_yahoo_data()
     test_leveraged_etf_detection()
     test_covariance_computation()
+    test_block_recurrence_matches_monthly_recurrence()
+    test_batch_simulation_uses_common_random_numbers()
+    test_horizon_simulation_reuses_path_prefixes()
+    test_variance_reduced_samplers_preserve_distribution()
+    test_wealth_accumulator_streams_and_merges()
+    test_float32_simulation_matches_float64_scores()
+    test_simulation_cache_memoizes_summaries()
+    test_analytic_estimate_tracks_bootstrap()
+    test_sensitivity_surface_matches_individual_runs()
+    test_required_contribution_solver()
+    test_asset_level_engine()
+    test_resampler_family()
+    test_historical_window_replay()
+    test_compute_scores_batch_matches_single()
+    test_candidate_weight_sweep()
+    test_price_store_fetches_only_missing_months()
+    test_returns_cache_serves_subsets()
+    test_returns_cache_subset_with_calendar_gap()
+    test_single_flight_coalesces_concurrent_fetches()
+    test_market_data_providers()
 
     print()
     print("=" * 60)
@@ -9,6 +9,9 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Offline, deterministic market data unless MARKET_DATA_PROVIDER=yahoo is set
+os.environ.setdefault("MARKET_DATA_PROVIDER", "synthetic")
+
 from quant_eval import (
     parse_goal,
     download_yahoo_data,
@@ -16,6 +19,40 @@ from quant_eval import (
     compute_scores
 )
 
+from tests import synthetic_returns
+
+
+def _legacy_run_simulation(goal_params, portfolio, historical_returns, num_paths=3000):
+    """Reference copy of the original per-path, per-month simulation loop"""
+
+    import hashlib
+    import json
+    import numpy as np
+
+    W0 = goal_params['starting_wealth']
+    C = goal_params['monthly_contribution']
+    tickers = [t['symbol'] for t in portfolio['tickers']]
+    weights = np.array([t['allocation_percent'] / 100 for t in portfolio['tickers']])
+    portfolio_returns = (historical_returns[tickers] * weights).sum(axis=1).values
+    n_months = len(portfolio_returns)
+
+    seed_str = f"{goal_params['goal_description']}{json.dumps(portfolio, sort_keys=True)}{num_paths}"
+    np.random.seed(int(hashlib.md5(seed_str.encode()).hexdigest(), 16) % (2**32))
+
+    terminal_wealths = []
+    for _ in range(num_paths):
+        wealth = W0
+        for month in range(goal_params['timeline_years'] * 12):
+            if n_months > 6:
+                block_start = np.random.randint(0, n_months - 6 + 1)
+                sampled_return = portfolio_returns[block_start + month % 6]
+            else:
+                sampled_return = portfolio_returns[np.random.randint(0, n_months)]
+            wealth = wealth * (1 + sampled_return) + C
+        terminal_wealths.append(wealth)
+
+    return np.array(terminal_wealths)
+
 
 def test_reproducibility_simple_portfolio():
     """
@@ -42,7 +79,7 @@ def test_reproducibility_simple_portfolio():
     # Run simulation 5 times
     results = []
     for i in range(5):
-        sim_result = run_simulation(goal_params, portfolio, historical_returns)
+        sim_result = run_simulation(goal_params, portfolio, historical_returns, use_cache=False)
         results.append(sim_result)
 
     # Verify all results are identical
@@ -89,8 +126,8 @@ def test_reproducibility_with_different_portfolios():
     data_b = download_yahoo_data(["VTI"], years=5)
 
     # Run each portfolio 3 times
-    results_a = [run_simulation(goal_params, portfolio_a, data_a) for _ in range(3)]
-    results_b = [run_simulation(goal_params, portfolio_b, data_b) for _ in range(3)]
+    results_a = [run_simulation(goal_params, portfolio_a, data_a, use_cache=False) for _ in range(3)]
+    results_b = [run_simulation(goal_params, portfolio_b, data_b, use_cache=False) for _ in range(3)]
 
     # Verify reproducibility within each portfolio
     assert all(r['probability_of_success'] == results_a[0]['probability_of_success'] for r in results_a), \
@@ -126,7 +163,7 @@ def test_deterministic_seed():
 
     # Run multiple times
     probabilities = [
-        run_simulation(goal_params, portfolio, data)['probability_of_success']
+        run_simulation(goal_params, portfolio, data, use_cache=False)['probability_of_success']
         for _ in range(10)
     ]
 
@@ -136,6 +173,229 @@ def test_deterministic_seed():
     print(f"✓ Deterministic seed test passed: {probabilities[0]:.1f}% (consistent across 10 runs)")
 
 
+def test_vectorized_engine_matches_legacy_loop():
+    """
+    The vectorized engine must reproduce the original loop bit for bit.
+    """
+
+    import numpy as np
+
+    goal_params = parse_goal("I have $10,000 and want to save $100,000 in 20 years, investing $200/month")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+
+    for n_months in (60, 5):
+        data = synthetic_returns(["VTI", "BND"], n_months=n_months)
+        expected = _legacy_run_simulation(goal_params, portfolio, data, num_paths=200)
+        result = run_simulation(
+            goal_params, portfolio, data, num_paths=200, return_terminal_wealths=True
+        )
+
+        assert np.array_equal(result['terminal_wealths'], expected), \
+            f"Vectorized engine differs from legacy loop with {n_months} months of history"
+
+    print("✓ Vectorized engine matches legacy loop bit for bit")
+
+
+def test_chunked_simulation_matches_single_pass():
+    """
+    Chunked simulation must give identical results for any chunk size or memory ceiling.
+    """
+
+    import numpy as np
+
+    goal_params = parse_goal("I have $10,000 and want to save $100,000 in 20 years, investing $200/month")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+    data = synthetic_returns(["VTI", "BND"])
+
+    for engine in ("monthly", "block"):
+        single = run_simulation(
+            goal_params, portfolio, data, num_paths=1000, engine=engine, return_terminal_wealths=True
+        )
+        chunked = run_simulation(
+            goal_params, portfolio, data, num_paths=1000, engine=engine, chunk_size=37, return_terminal_wealths=True
+        )
+        capped = run_simulation(
+            goal_params, portfolio, data, num_paths=1000, engine=engine, max_memory_mb=0.5, return_terminal_wealths=True
+        )
+
+        assert np.array_equal(single['terminal_wealths'], chunked['terminal_wealths']), \
+            f"{engine} engine differs when chunked"
+        assert np.array_equal(single['terminal_wealths'], capped['terminal_wealths']), \
+            f"{engine} engine differs under a memory ceiling"
+
+    print("✓ Chunked simulation matches single pass")
+
+
+def test_sharded_simulation_independent_of_worker_count():
+    """
+    Sharded simulation must give identical results for any number of workers.
+    """
+
+    import numpy as np
+    import quant_eval
+
+    goal_params = parse_goal("Retire in 30 years with $1,000,000")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 70},
+            {"symbol": "BND", "allocation_percent": 30}
+        ]
+    }
+    data = synthetic_returns(["VTI", "BND"])
+
+    shard_paths = quant_eval.SIMULATION_SHARD_PATHS
+    quant_eval.SIMULATION_SHARD_PATHS = 250
+    try:
+        serial = run_simulation(
+            goal_params, portfolio, data, num_paths=1000, workers=1, return_terminal_wealths=True
+        )
+        parallel = run_simulation(
+            goal_params, portfolio, data, num_paths=1000, workers=3, return_terminal_wealths=True
+        )
+        # An explicit stream of either kind only seeds the shard spawn tree
+        seeded = {
+            (make_rng.__name__, workers): run_simulation(
+                goal_params, portfolio, data, num_paths=1000, workers=workers, rng=make_rng(5),
+                return_terminal_wealths=True
+            )['terminal_wealths']
+            for make_rng in (np.random.RandomState, np.random.default_rng)
+            for workers in (1, 3)
+        }
+    finally:
+        quant_eval.SIMULATION_SHARD_PATHS = shard_paths
+
+    assert np.array_equal(serial['terminal_wealths'], parallel['terminal_wealths']), \
+        "Sharded results depend on the worker count"
+    for name in ("RandomState", "default_rng"):
+        assert np.array_equal(seeded[(name, 1)], seeded[(name, 3)]), \
+            f"Sharded results with an explicit {name} depend on the worker count"
+
+    print(f"✓ Sharded simulation independent of worker count: {serial['probability_of_success']:.1f}%")
+
+
+def test_concurrent_simulations_do_not_interfere():
+    """
+    Simulations running on several threads must match their serial results.
+    """
+
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+    data = synthetic_returns(["VTI", "BND"])
+    goals = [
+        parse_goal(f"I have $10,000 and want to save ${target},000 in 20 years, investing $200/month")
+        for target in (80, 100, 120, 140)
+    ]
+
+    def simulate(goal, **kwargs):
+        return run_simulation(goal, portfolio, data, num_paths=500, return_terminal_wealths=True, **kwargs)
+
+    serial = [simulate(g)['terminal_wealths'] for g in goals]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concurrent = list(executor.map(
+            lambda g: simulate(g, chunk_size=50)['terminal_wealths'],
+            goals * 3
+        ))
+
+    for i, wealths in enumerate(concurrent):
+        assert np.array_equal(wealths, serial[i % len(goals)]), f"Concurrent run {i} differs from serial run"
+
+    # An explicit Generator is reproducible from its seed
+    first = run_simulation(
+        goals[0], portfolio, data, num_paths=500, rng=np.random.default_rng(1), return_terminal_wealths=True
+    )
+    second = run_simulation(
+        goals[0], portfolio, data, num_paths=500, rng=np.random.default_rng(1), return_terminal_wealths=True
+    )
+    assert np.array_equal(first['terminal_wealths'], second['terminal_wealths']), \
+        "Explicit Generator runs differ"
+
+    print("✓ Concurrent simulations do not interfere")
+
+
+def test_adaptive_simulation_stops_early_on_prefix():
+    """
+    Adaptive mode must stop early for a hopeless goal and use a prefix of the full run.
+    """
+
+    import numpy as np
+
+    goal_params = parse_goal("I have $1,000 and want to save $10,000,000 in 10 years, investing $100/month")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+    data = synthetic_returns(["VTI", "BND"])
+
+    full = run_simulation(goal_params, portfolio, data, num_paths=3000, return_terminal_wealths=True)
+    adaptive = run_simulation(
+        goal_params, portfolio, data, num_paths=3000, tolerance=2.0, return_terminal_wealths=True
+    )
+
+    used = adaptive['num_paths_used']
+    assert used < 3000, f"Adaptive run did not stop early ({used} paths)"
+    assert adaptive['ci_width'] <= 2.0, f"CI width {adaptive['ci_width']} above tolerance"
+    assert np.array_equal(adaptive['terminal_wealths'], full['terminal_wealths'][:used]), \
+        "Adaptive paths are not a prefix of the full run"
+
+    print(f"✓ Adaptive simulation stopped after {used} paths (CI width {adaptive['ci_width']:.2f}pp)")
+
+
+def test_cached_summary_matches_uncached_run():
+    """
+    A summary served from the simulation cache must equal a fresh simulation of the same request.
+    """
+
+    import quant_eval
+    from quant_eval import SimulationCache
+
+    goal_params = parse_goal("I have $10,000 and want to save $100,000 in 20 years, investing $200/month")
+    portfolio = {
+        "tickers": [
+            {"symbol": "VTI", "allocation_percent": 60},
+            {"symbol": "BND", "allocation_percent": 40}
+        ]
+    }
+    data = synthetic_returns(["VTI", "BND"])
+
+    previous_cache = quant_eval.simulation_cache
+    quant_eval.simulation_cache = SimulationCache()
+    try:
+        # Variance-reduced samplers form pairs and strata per chunk, so chunk sizes must not share entries
+        for options in (
+            {}, {"engine": "block"}, {"sampler": "stratified"}, {"sampler": "stratified", "chunk_size": 250},
+            {"sampler": "antithetic", "max_memory_mb": 0.5}, {"tolerance": 2.0}
+        ):
+            run_simulation(goal_params, portfolio, data, num_paths=1000, **options)
+            cached = run_simulation(goal_params, portfolio, data, num_paths=1000, **options)
+            uncached = run_simulation(goal_params, portfolio, data, num_paths=1000, use_cache=False, **options)
+            assert cached == uncached, f"Cached summary differs from uncached run for {options}"
+
+        assert quant_eval.simulation_cache.stats()['hits'] == 6
+    finally:
+        quant_eval.simulation_cache = previous_cache
+
+    print("✓ Cached summaries match uncached runs")
+
+
 if __name__ == "__main__":
     print("Running reproducibility tests...")
     print()
@@ -152,6 +412,30 @@ if __name__ == "__main__":
     test_deterministic_seed()
     print()
 
+    print("Test 4: Vectorized engine matches legacy loop")
+    test_vectorized_engine_matches_legacy_loop()
+    print()
+
+    print("Test 5: Chunked simulation matches single pass")
+    test_chunked_simulation_matches_single_pass()
+    print()
+
+    print("Test 6: Sharded simulation independent of worker count")
+    test_sharded_simulation_independent_of_worker_count()
+    print()
+
+    print("Test 7: Concurrent simulations do not interfere")
+    test_concurrent_simulations_do_not_interfere()
+    print()
+
+    print("Test 8: Adaptive simulation stops early")
+    test_adaptive_simulation_stops_early_on_prefix()
+    print()
+
+    print("Test 9: Cached summary matches uncached run")
+    test_cached_summary_matches_uncached_run()
+    print()
+
     print("=" * 60)
     print("✓ ALL REPRODUCIBILITY TESTS PASSED")
     print("=" * 60)